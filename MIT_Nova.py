@@ -1,42 +1,19 @@
 import streamlit as st
-from groq import Groq
+from llm_backends import get_backend
 from langchain_community.vectorstores import Chroma
 from langchain_community.embeddings import SentenceTransformerEmbeddings
-import base64
-import time
+from rag_engine import rag_query
+from chat_view import cancel_job, collect_jobs, get_job_queue, in_flight, poll_interval, submit_question, wait_for_answers
+import os
 
-# Initialize Groq Client
-client = Groq(api_key="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")
+# Initialize LLM backend (Groq unless NOVA_LLM_BACKEND picks openai or mock); the Groq
+# key is this app's own unless GROQ_API_KEY is set, see llm_backends.resolve_groq_api_key
+client = get_backend(app=__file__)
 
 # Load vector DBs
 json_db = Chroma(persist_directory="./json_db", embedding_function=SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2"))
 pdf_db = Chroma(persist_directory="./pdf_db", embedding_function=SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2"))
 
-# RAG Function
-def rag_query(json_db, pdf_db, user_query, threshold=0.2, k=7):
-    json_hits = json_db.similarity_search_with_relevance_scores(user_query, k=k)
-    filtered_json = [doc for doc, score in json_hits if score >= threshold]
-
-    pdf_hits = pdf_db.similarity_search_with_relevance_scores(user_query, k=k)
-    filtered_pdf = [doc for doc, score in pdf_hits if score >= threshold]
-
-    all_docs = filtered_json + filtered_pdf
-    if not all_docs:
-        return "Sorry, I couldn't find relevant information. Please rephrase your question."
-
-    context = "\n".join([doc.page_content for doc in all_docs])
-
-    response = client.chat.completions.create(
-        model="llama3-8b-8192",
-        messages=[
-            {"role": "system", "content": "Answer professionally based on the context."},
-            {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {user_query}"}
-        ],
-        temperature=0.3,
-        max_tokens=1000
-    )
-    return response.choices[0].message.content.strip()
-
 # Theme Setup
 def set_custom_theme(dark_mode):
     theme = {
@@ -93,6 +70,10 @@ if "conversation" not in st.session_state:
     st.session_state.conversation = []
 if "dark_mode" not in st.session_state:
     st.session_state.dark_mode = False
+# A single chat; chat_view's job bookkeeping files answers under a chat id
+if "current_chat" not in st.session_state:
+    st.session_state.current_chat = "main"
+    st.session_state.chat_history = {"main": st.session_state.conversation}
 
 # ====== Page Config ======
 st.set_page_config(
@@ -104,11 +85,12 @@ st.set_page_config(
 
 # ====== Sidebar ======
 with st.sidebar:
-    # Logo with white background
-    try:
-        logo = base64.b64encode(open("logo.png", "rb").read()).decode()
+    # Logo with white background, served from ./static (enableStaticServing in
+    # .streamlit/config.toml) so the browser caches it instead of receiving inline
+    # base64 on every rerun
+    if os.path.exists("static/logo.png"):
         st.markdown(
-            f"""
+            """
             <div style="
                 background-color: white;
                 padding: 10px;
@@ -116,13 +98,13 @@ with st.sidebar:
                 display: inline-block;
                 margin-bottom: 20px;
             ">
-                <img src="data:image/png;base64,{logo}" width="180">
+                <img src="app/static/logo.png" width="180">
             </div>
             """,
             unsafe_allow_html=True
         )
-    except:
-        st.image("logo.png", width=150)
+    else:
+        st.markdown("### MIT Nova")
     
     st.markdown("---")
     
@@ -171,52 +153,72 @@ st.markdown(
 
 st.caption("Your AI assistant for company policies and HR information")
 
-# Chat input
-query = st.text_input(
-    "Ask your question...",
-    placeholder="E.g.,what is the shift allowance from 2pm to 10pm ?",
-    label_visibility="collapsed"
-)
+# Chat input. Runs as a fragment: the answer is generated on the job queue instead of
+# the script thread, and while it is in flight only this part reruns to check on it
+job_queue = get_job_queue()
+
+@st.fragment(run_every=poll_interval())
+def ask_box():
+    collect_jobs(job_queue)
+    query = st.text_input(
+        "Ask your question...",
+        placeholder="E.g.,what is the shift allowance from 2pm to 10pm ?",
+        label_visibility="collapsed"
+    )
 
-if st.button("Ask ➔", use_container_width=True) or query:
-    if query.strip():
-        with st.spinner("🔍 Searching ..."):
-            answer = rag_query(json_db, pdf_db, query)
-            st.session_state.conversation.append((query, answer))
-        
-        # Display answer
-        st.markdown(f"""
-        <div class="chat-bubble">
-            <h4 style='margin-top:0;color:var(--text-color)'>Answer</h4>
-            <div style='margin-bottom:0'>{answer}</div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Feedback
-        st.markdown("**Was this helpful?**")
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("👍 Yes", use_container_width=True):
-                st.toast("Thank you!")
-        with col2:
-            if st.button("👎 No", use_container_width=True):
-                st.toast("We'll improve this answer")
-    else:
-        st.markdown("""
-        <style>
-            .custom-warning {
-                background-color: #fff3cd;
-                color: #856404;
-                border-left: 4px solid #ffc107;
-                padding: 12px;
-                border-radius: 4px;
-                margin: 16px 0;
-            }
-        </style>
-        <div class="custom-warning">
-            ⚠️ Please enter a question
-        </div>
-        """, unsafe_allow_html=True)
+    asked = st.button("Ask ➔", use_container_width=True)
+    if asked or query:
+        if query.strip():
+            # The input keeps its value across reruns; only a new question or the
+            # button sends it again
+            if asked or query != st.session_state.get("last_query"):
+                st.session_state.last_query = query
+                submit_question(job_queue, query, rag_query, json_db, pdf_db, query, client=client)
+
+            index = len(st.session_state.conversation) - 1
+            waiting = in_flight()
+            if index in waiting:
+                st.info("🔍 Searching ...")
+                st.button("Cancel", key=f"cancel_{waiting[index]}", on_click=cancel_job,
+                          args=(job_queue, waiting[index]))
+            else:
+                answer = st.session_state.conversation[index][1]
+                # Display answer
+                st.markdown(f"""
+                <div class="chat-bubble">
+                    <h4 style='margin-top:0;color:var(--text-color)'>Answer</h4>
+                    <div style='margin-bottom:0'>{answer}</div>
+                </div>
+                """, unsafe_allow_html=True)
+
+                # Feedback
+                st.markdown("**Was this helpful?**")
+                col1, col2 = st.columns(2)
+                with col1:
+                    if st.button("👍 Yes", use_container_width=True):
+                        st.toast("Thank you!")
+                with col2:
+                    if st.button("👎 No", use_container_width=True):
+                        st.toast("We'll improve this answer")
+        else:
+            st.markdown("""
+            <style>
+                .custom-warning {
+                    background-color: #fff3cd;
+                    color: #856404;
+                    border-left: 4px solid #ffc107;
+                    padding: 12px;
+                    border-radius: 4px;
+                    margin: 16px 0;
+                }
+            </style>
+            <div class="custom-warning">
+                ⚠️ Please enter a question
+            </div>
+            """, unsafe_allow_html=True)
+    wait_for_answers(job_queue)
+
+ask_box()
 
 # Footer
 st.markdown("---")
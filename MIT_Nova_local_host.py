@@ -3,60 +3,60 @@ import pysqlite3
 sys.modules['sqlite3'] = pysqlite3'''
 
 import streamlit as st
-from groq import Groq
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import SentenceTransformerEmbeddings
-import base64
+from llm_backends import get_backend
+from rag_engine import rag_query_shared
+from app_index import INDEX_VERSION, open_app_index
+from chat_view import (collect_jobs, get_job_queue, poll_interval, render_pending, render_transcript,
+                       reset_window, submit_question, wait_for_answers)
 import time
 import os
 
-# Initialize Groq Client
-client = Groq(api_key="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")
+# Initialize LLM backend (Groq unless NOVA_LLM_BACKEND picks openai or mock); the Groq
+# key is this app's own unless GROQ_API_KEY is set, see llm_backends.resolve_groq_api_key
+client = get_backend(app=__file__)
 
-# Load vector DBs
+# Load vector DBs: once per process (see app_index), and already open when started
+# through warmup.py
 try:
-    json_db = Chroma(
-        persist_directory="./json_db", 
-        embedding_function=SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
-    )
-    pdf_db = Chroma(
-        persist_directory="./pdf_db", 
-        embedding_function=SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
-    )
+    json_db, pdf_db, faq_index = open_app_index()
 except Exception as e:
     st.error(f"Error loading databases: {str(e)}")
     st.stop()
 
-# RAG Function
-def rag_query(json_db, pdf_db, user_query, threshold=0.2, k=7):
-    try:
-        json_hits = json_db.similarity_search_with_relevance_scores(user_query, k=k)
-        filtered_json = [doc for doc, score in json_hits if score >= threshold]
-
-        pdf_hits = pdf_db.similarity_search_with_relevance_scores(user_query, k=k)
-        filtered_pdf = [doc for doc, score in pdf_hits if score >= threshold]
-
-        all_docs = filtered_json + filtered_pdf
-        if not all_docs:
-            return "Sorry, I couldn't find relevant information. Please rephrase your question."
-
-        context = "\n".join([doc.page_content for doc in all_docs])
-
-        response = client.chat.completions.create(
-            model="llama3-8b-8192",
-            messages=[
-                {"role": "system", "content": "Answer professionally based on the context."},
-                {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {user_query}"}
-            ],
-            temperature=0.3,
-            max_tokens=1000
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        return f"An error occurred: {str(e)}"
+# Sidebar chat-history styles, appended to the cached theme CSS
+SIDEBAR_CSS = """
+    <style>
+        
+        /* Specific chat item styling */
+        section[data-testid="stSidebar"] button.chat {
+            border: 1px solid #e0e0e0 !important;
+            border-radius: 8px !important;
+            padding: 10px 14px !important;
+            margin: 4px 0 !important;
+            font-size: 15px !important;
+            text-align: left !important;
+            width: 100% !important;
+            transition: background-color 0.2s !important;
+        }
+        
+        /* Hover state */
+        section[data-testid="stSidebar"] button.chat:hover {
+            background-color: #f5f5f5 !important;
+        }
+        
+        /* Active state */
+        section[data-testid="stSidebar"] button.active {
+            border: 2px solid #10a37f !important;
+            background-color: white !important;
+            font-weight: 600 !important;
+        }
+    </style>
+"""
 
 # Theme Setup
-def set_custom_theme(dark_mode):
+# Theme CSS is built once per process for each mode and reused across reruns
+@st.cache_resource(show_spinner=False)
+def build_theme_css(dark_mode):
     theme = {
         "bg": "#343541" if dark_mode else "#ffffff",
         "sidebar":  "#3E4145" if dark_mode else "#898b8e",
@@ -76,7 +76,7 @@ def set_custom_theme(dark_mode):
         "input-selection-text": "#ffffff" if dark_mode else "#212529",
     }
    
-    st.markdown(f"""
+    return f"""
     <style>
         @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@600&display=swap');
        
@@ -263,7 +263,10 @@ def set_custom_theme(dark_mode):
             to {{ transform: rotate(360deg); }}
         }}
     </style>
-    """, unsafe_allow_html=True)
+    """ + SIDEBAR_CSS
+
+def set_custom_theme(dark_mode):
+    st.markdown(build_theme_css(dark_mode), unsafe_allow_html=True)
 
 # ====== Session State ======
 if 'dark_mode' not in st.session_state:
@@ -291,12 +294,12 @@ st.set_page_config(
 set_custom_theme(st.session_state.dark_mode)
 
 # Load logo
-try:
-    with open("logo.png", "rb") as image_file:
-        logo = base64.b64encode(image_file.read()).decode()
-        logo_html = f'<div style="background: white; padding: 5px; border-radius: 4px; display: inline-block;"><img src="data:image/png;base64,{logo}" alt="MIT Nova Logo" style="max-width: 100%; height: auto;"></div>'
-except Exception as e:
-    st.error(f"Error loading logo: {str(e)}")
+# Served from ./static (enableStaticServing in .streamlit/config.toml) so the
+# browser caches it instead of receiving inline base64 on every rerun
+if os.path.exists("static/logo.png"):
+    logo_html = '<div style="background: white; padding: 5px; border-radius: 4px; display: inline-block;"><img src="app/static/logo.png" alt="MIT Nova Logo" style="max-width: 100%; height: auto;"></div>'
+else:
+    st.error("Error loading logo: static/logo.png not found")
     logo_html = '<h3>MIT Nova</h3>'
 
 def create_new_chat():
@@ -304,10 +307,12 @@ def create_new_chat():
     st.session_state.current_chat = new_chat_id
     st.session_state.conversation = []
     st.session_state.chat_history[new_chat_id] = []
+    reset_window()
 
 def switch_chat(chat_id):
     st.session_state.current_chat = chat_id
     st.session_state.conversation = st.session_state.chat_history[chat_id]
+    reset_window()
 
 # ====== Sidebar ======
 with st.sidebar:
@@ -337,37 +342,6 @@ with st.sidebar:
     st.markdown("---")
     st.markdown("#### Chat History:")
 
-    # Custom CSS
-    # Custom CSS - Force white background and black text
-    st.markdown("""
-    <style>
-        
-        /* Specific chat item styling */
-        section[data-testid="stSidebar"] button.chat {
-            border: 1px solid #e0e0e0 !important;
-            border-radius: 8px !important;
-            padding: 10px 14px !important;
-            margin: 4px 0 !important;
-            font-size: 15px !important;
-            text-align: left !important;
-            width: 100% !important;
-            transition: background-color 0.2s !important;
-        }
-        
-        /* Hover state */
-        section[data-testid="stSidebar"] button.chat:hover {
-            background-color: #f5f5f5 !important;
-        }
-        
-        /* Active state */
-        section[data-testid="stSidebar"] button.active {
-            border: 2px solid #10a37f !important;
-            background-color: white !important;
-            font-weight: 600 !important;
-        }
-    </style>
-    """, unsafe_allow_html=True)
-
     # Display chat history
     for chat_id in reversed(list(st.session_state.chat_history.keys())):
         # Get chat title
@@ -399,29 +373,24 @@ st.markdown(f"""
 # Chat container
 chat_container = st.container()
 
-# Display conversation
+# Display conversation (latest window only)
 with chat_container:
-    for i, (query, answer) in enumerate(st.session_state.conversation):
-        # User message
-        st.markdown(f"""
-        <div class="chat-message chat-message-user">
-            <div class="chat-message-avatar chat-message-avatar-user">U</div>
-            <div class="chat-message-content">{query}</div>
-        </div>
-        """, unsafe_allow_html=True)
-       
-        # Bot message
-        st.markdown(f"""
-        <div class="chat-message chat-message-bot">
-            <div class="chat-message-avatar chat-message-avatar-bot">N</div>
-            <div class="chat-message-content">{answer}</div>
-        </div>
-        """, unsafe_allow_html=True)
+    render_transcript(st.session_state.conversation)
 
 # Input area at bottom
-with st.container():
+# Runs as a fragment so sending a message doesn't redraw the transcript; while
+# answers are in flight it also polls the job queue, rerunning only itself
+job_queue = get_job_queue()
+
+@st.fragment(run_every=poll_interval())
+def chat_input_area():
+    # Finished answers are drawn in place below, without redrawing the transcript
+    collect_jobs(job_queue)
+    # Messages the transcript left out, filled in once the form is handled
+    new_messages = st.container()
+
     st.markdown("<div style='height: 100px;'></div>", unsafe_allow_html=True)  # Spacer
-   
+
     # Chat input form
     with st.form("chat_input_form", clear_on_submit=True):
         col1, col2 = st.columns([6, 1])
@@ -434,51 +403,17 @@ with st.container():
             )
         with col2:
             submit_button = st.form_submit_button("Send", use_container_width=True)
-   
+
     if submit_button and query.strip():
-        # Add user message to conversation
-        st.session_state.conversation.append((query, ""))
-        st.session_state.chat_history[st.session_state.current_chat] = st.session_state.conversation
-       
-        # Display user message immediately
-        with chat_container:
-            st.markdown(f"""
-            <div class="chat-message chat-message-user">
-                <div class="chat-message-avatar chat-message-avatar-user">U</div>
-                <div class="chat-message-content">{query}</div>
-            </div>
-            """, unsafe_allow_html=True)
-       
-        # Display typing indicator
-        with chat_container:
-            typing_indicator = st.markdown("""
-            <div class="chat-message chat-message-bot">
-                <div class="chat-message-avatar chat-message-avatar-bot">N</div>
-                <div class="chat-message-content">
-                    <div class="spinner"></div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-       
-        # Get response
-        answer = rag_query(json_db, pdf_db, query)
-       
-        # Update conversation
-        st.session_state.conversation[-1] = (query, answer)
-        st.session_state.chat_history[st.session_state.current_chat] = st.session_state.conversation
-       
-        # Remove typing indicator and display answer
-        typing_indicator.empty()
-        with chat_container:
-            st.markdown(f"""
-            <div class="chat-message chat-message-bot">
-                <div class="chat-message-avatar chat-message-avatar-bot">N</div>
-                <div class="chat-message-content">{answer}</div>
-            </div>
-            """, unsafe_allow_html=True)
-       
-        # Rerun to update the chat history sidebar
-        #st.rerun()
+        # Answer in the background; drawn above the form with a typing indicator until it arrives
+        submit_question(job_queue, query, rag_query_shared, json_db, pdf_db, query,
+                        client=client, faq_index=faq_index, index_version=INDEX_VERSION)
+
+    with new_messages:
+        render_pending(job_queue, st.session_state.conversation)
+    wait_for_answers(job_queue)
+
+chat_input_area()
 
 # Footer
 st.markdown("""
@@ -0,0 +1,110 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Admission control in front of the LLM: a token bucket sized to the provider quota,
+# a cap on concurrent calls, and a bounded wait queue served earliest-deadline-first.
+# Requests that can't start before their deadline are shed with Overloaded so the
+# caller can fall back to a cached or FAQ answer instead of a provider error.
+
+# Groq's free tier for llama3-8b-8192 allows 30 requests per minute
+LLM_REQUESTS_PER_MINUTE = float(os.environ.get("NOVA_LLM_RPM", "30"))
+LLM_MAX_CONCURRENT = int(os.environ.get("NOVA_LLM_CONCURRENCY", "4"))
+LLM_MAX_QUEUE = int(os.environ.get("NOVA_LLM_QUEUE", "32"))
+# How long a question may wait for an LLM slot, in seconds
+LLM_QUEUE_DEADLINE = float(os.environ.get("NOVA_LLM_DEADLINE", "15"))
+
+
+class Overloaded(Exception):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1.0, rate_per_minute / 6.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        # Seconds until one token is available
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+    def drain(self):
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+class AdmissionController:
+    def __init__(self, requests_per_minute=LLM_REQUESTS_PER_MINUTE, max_concurrent=LLM_MAX_CONCURRENT,
+                 max_queue=LLM_MAX_QUEUE, default_deadline=LLM_QUEUE_DEADLINE):
+        self.bucket = TokenBucket(requests_per_minute)
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.default_deadline = default_deadline
+        self.running = 0
+        self.waiting = []
+        self.counter = itertools.count()
+        self.cond = threading.Condition()
+        self.shed = 0
+
+    def _shed(self):
+        self.shed += 1
+        raise Overloaded("LLM capacity exhausted")
+
+    @contextmanager
+    def admit(self, deadline=None):
+        # deadline is an absolute time.monotonic() value
+        if deadline is None:
+            deadline = time.monotonic() + self.default_deadline
+        with self.cond:
+            if len(self.waiting) >= self.max_queue:
+                self._shed()
+            entry = (deadline, next(self.counter))
+            heapq.heappush(self.waiting, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self.waiting[0] == entry and self.running < self.max_concurrent:
+                        wait = self.bucket.wait_time()
+                        if wait == 0:
+                            break
+                    else:
+                        wait = None
+                    # Shed as soon as the deadline can't be met, rather than at the deadline
+                    if now + (wait or 0) > deadline:
+                        self._shed()
+                    self.cond.wait(timeout=min(wait if wait is not None else deadline - now, deadline - now))
+                heapq.heappop(self.waiting)
+                self.bucket.take()
+                self.running += 1
+            except Overloaded:
+                self.waiting.remove(entry)
+                heapq.heapify(self.waiting)
+                raise
+            finally:
+                self.cond.notify_all()
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.running -= 1
+                self.cond.notify_all()
+
+    def back_off(self):
+        # Provider said 429: stop issuing until the bucket refills
+        with self.cond:
+            self.bucket.drain()
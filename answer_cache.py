@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Finished answers keyed by (normalized question, index version, filters). A re-index
+# changes the version, so stale answers are never served for a rebuilt index.
+
+ANSWER_TTL = float(os.environ.get("NOVA_ANSWER_TTL", str(24 * 3600)))
+MAX_ANSWERS = 2000
+# How often a running app checks the cache file for answers written by another process
+# (precompute_answers.py)
+RELOAD_INTERVAL = 30.0
+
+
+class AnswerCache:
+    def __init__(self, path=None, ttl=ANSWER_TTL, max_entries=MAX_ANSWERS):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.loaded_mtime = None
+        self.checked = time.monotonic()
+        if path and os.path.exists(path):
+            self.load()
+
+    @staticmethod
+    def key(normalized, index_version, filters_key=""):
+        # filters_key is the canonical form of explicit search filters (rag_engine.filters_key);
+        # unfiltered questions keep the plain key
+        key = f"{index_version}\t{normalized}"
+        return f"{key}\t{filters_key}" if filters_key else key
+
+    def get(self, normalized, index_version, filters_key=""):
+        self.reload_if_changed()
+        key = self.key(normalized, index_version, filters_key)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry["created"] > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry["answer"]
+
+    def put(self, normalized, index_version, answer, filters_key=""):
+        key = self.key(normalized, index_version, filters_key)
+        with self.lock:
+            self.entries[key] = {"answer": answer, "created": time.time()}
+            self.entries.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        # Least recently used first; callers hold the lock
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def load(self):
+        mtime = os.path.getmtime(self.path)
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        with self.lock:
+            self.entries.update(data)
+            # A file written by another process (or with a larger limit) can hold more
+            self._evict()
+            self.loaded_mtime = mtime
+
+    def reload_if_changed(self):
+        now = time.monotonic()
+        if not self.path or now - self.checked < RELOAD_INTERVAL:
+            return
+        self.checked = now
+        try:
+            if os.path.getmtime(self.path) != self.loaded_mtime:
+                self.load()
+        except (OSError, ValueError):
+            # Missing, or replaced mid-read; the next check retries
+            pass
+
+    def save(self):
+        with self.lock:
+            data = dict(self.entries)
+        tmp_path = f"{self.path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
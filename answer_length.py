@@ -0,0 +1,49 @@
+import re
+
+from model_router import DETAIL_PATTERN, is_multi_part
+
+# Predicts how long an answer needs to be, so short factual questions don't request
+# (and wait for) a 1000-token budget. Returns a max_tokens budget and a matching style
+# instruction for the prompt.
+
+LENGTHS = {
+    "short": {
+        "max_tokens": 150,
+        "style": "Answer in one or two sentences.",
+    },
+    "medium": {
+        "max_tokens": 400,
+        "style": "Answer concisely, in a short paragraph or a few bullet points.",
+    },
+    "long": {
+        "max_tokens": 1000,
+        "style": "Be slightly elaborate and cover every relevant point from the context.",
+    },
+}
+
+FACTUAL_PATTERN = re.compile(
+    r"^(what is|what's|who is|who's|when|where|how many|how much|which|is there|can i|do i|"
+    r"mail id|email|contact)\b",
+    re.IGNORECASE,
+)
+# A question answered by this little context is a lookup, whatever its wording
+SHORT_CONTEXT_CHARS = 600
+
+
+def predict_length(user_query, context):
+    question = user_query.strip()
+    if DETAIL_PATTERN.search(question) or is_multi_part(question):
+        return "long"
+    if FACTUAL_PATTERN.search(question) or len(context) <= SHORT_CONTEXT_CHARS:
+        return "short"
+    if len(question.split()) <= 4:
+        # Bare topics like "PTO" or "web clock"
+        return "short"
+    return "medium"
+
+
+def answer_budget(user_query, context, tier_max_tokens):
+    # Returns (length label, max_tokens, style instruction)
+    length = predict_length(user_query, context)
+    spec = LENGTHS[length]
+    return length, min(spec["max_tokens"], tier_max_tokens), spec["style"]
@@ -0,0 +1,44 @@
+import functools
+import os
+
+from embedding_service import shared_embeddings
+from index_snapshot import open_version, snapshot_version
+
+# The index a single-process Streamlit app (MIT_Nova_1.py, MIT_Nova_local_host.py)
+# serves, opened once per process and shared by every session and rerun. warmup.py
+# opens it through the same function before the first session arrives.
+
+# One exported version, e.g. ./snapshots/<version> from `python index_snapshot.py`;
+# unset to open the Chroma stores directly
+SNAPSHOT_DIR = os.environ.get("NOVA_SNAPSHOT_DIR")
+# Single collection from `python unify_stores.py`; searched once for both sources
+UNIFIED_DB = os.environ.get("NOVA_UNIFIED_DB")
+# Cached and precomputed answers are keyed by the version being served
+INDEX_VERSION = snapshot_version(SNAPSHOT_DIR)
+
+
+@functools.lru_cache(maxsize=None)
+def open_app_index(model_name="all-MiniLM-L6-v2"):
+    # (json_db, pdf_db, faq_index). A process-wide cache rather than st.cache_resource,
+    # which only stores values computed during a script run, so warm-up can fill it
+    # before the server starts
+    embeddings = shared_embeddings(model_name)
+    faq_index = None
+    if SNAPSHOT_DIR:
+        # Read-only mmap snapshots, shared between replicas through the page cache
+        (json_db, pdf_db), faq_index = open_version(SNAPSHOT_DIR, embeddings)
+    elif UNIFIED_DB:
+        from ingest import open_unified_store
+
+        json_db = pdf_db = open_unified_store(UNIFIED_DB, embeddings)
+    else:
+        from langchain_community.vectorstores import Chroma
+
+        json_db = Chroma(persist_directory="./json_db", embedding_function=embeddings)
+        pdf_db = Chroma(persist_directory="./pdf_db", embedding_function=embeddings)
+    # Question-embedding index for the FAQ JSON, unless the snapshot brought its own
+    if faq_index is None:
+        from faq_index import FaqIndex
+
+        faq_index = FaqIndex.load_or_build("./company_policies.json", "./faq_index.npz", embeddings)
+    return json_db, pdf_db, faq_index
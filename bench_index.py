@@ -0,0 +1,111 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+from index_snapshot import SnapshotIndex
+from load_test import load_prompts, percentile
+
+# Recall and latency of the snapshot search modes against exact float32 search:
+#   exact   brute force over vectors.f32 (the reference)
+#   int8    int8 code scan plus exact re-scoring of the top candidates
+#   chroma  the persisted Chroma store the snapshot was exported from (--chroma-db)
+#
+#   python bench_index.py --snapshot ./snapshots/<version>/pdf --chroma-db ./pdf_db
+#
+# Queries are prompts.text embedded with MiniLM, or with --synthetic N, stored vectors
+# plus noise (no model needed).
+
+
+def synthetic_queries(index, n, noise, seed):
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(index), size=n)
+    queries = np.asarray(index.vectors[np.sort(rows)]) + rng.normal(0, noise, size=(n, index.vectors.shape[1]))
+    return queries.astype(np.float32)
+
+
+def timed(search, queries):
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query))
+        latencies.append(time.perf_counter() - start)
+    return results, latencies
+
+
+def recall(results, reference):
+    found = sum(len(set(r) & set(ref)) for r, ref in zip(results, reference))
+    return found / max(sum(len(ref) for ref in reference), 1)
+
+
+def summary(latencies):
+    return {f"p{p}_ms": round(1000 * percentile(latencies, p), 3) for p in (50, 90, 99)}
+
+
+def run(args):
+    exact_index = SnapshotIndex(args.snapshot, None, use_int8=False)
+    int8_index = SnapshotIndex(args.snapshot, None, use_int8=True)
+    if int8_index.codes is None:
+        raise SystemExit(f"{args.snapshot} has no int8 codes; re-export it with index_snapshot.py")
+
+    if args.synthetic:
+        queries = synthetic_queries(exact_index, args.synthetic, args.noise, args.seed)
+    else:
+        from embedding_service import shared_embeddings
+
+        queries = np.asarray(shared_embeddings(exact_index.manifest["model"]).embed_documents(
+            load_prompts(args.prompts)), dtype=np.float32)
+
+    ids = lambda hits: [exact_index.record(row)["id"] for row, score in hits]
+    reference, exact_latency = timed(lambda q: ids(exact_index.search_vector(q, args.k)), queries)
+    report = {
+        "snapshot": args.snapshot,
+        "rows": len(exact_index),
+        "queries": len(queries),
+        "k": args.k,
+        "exact": {"recall": 1.0, "resident_mb": round(exact_index.vectors.nbytes / 2**20, 2), **summary(exact_latency)},
+    }
+
+    for factor in args.rescore:
+        int8_search = lambda q: ids(int8_index.search_codes(q / np.linalg.norm(q), args.k, rescore_factor=factor))
+        results, latency = timed(int8_search, queries)
+        report[f"int8_rescore_x{factor}"] = {
+            "recall": round(recall(results, reference), 4),
+            # codes are scanned in full; float32 rows are read only for candidates
+            "resident_mb": round(int8_index.codes.nbytes / 2**20, 2),
+            **summary(latency),
+        }
+
+    if args.chroma_db:
+        from langchain_community.vectorstores import Chroma
+
+        db = Chroma(collection_name=args.collection, persist_directory=args.chroma_db)
+        id_by_text = {exact_index.record(row)["text"]: exact_index.record(row)["id"] for row in range(len(exact_index))}
+        chroma_search = lambda q: [id_by_text.get(doc.page_content) for doc, score in
+                                   db.similarity_search_by_vector_with_relevance_scores(q.tolist(), k=args.k)]
+        results, latency = timed(chroma_search, queries)
+        report["chroma_hnsw"] = {"recall": round(recall(results, reference), 4), **summary(latency)}
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare int8 and Chroma search against exact search")
+    parser.add_argument("--snapshot", required=True, help="one exported store, e.g. ./snapshots/<version>/pdf")
+    parser.add_argument("--chroma-db", help="Chroma directory the snapshot came from")
+    parser.add_argument("--collection", default="langchain")
+    parser.add_argument("--k", type=int, default=7)
+    parser.add_argument("--rescore", type=int, nargs="+", default=[1, 4, 8, 16],
+                        help="candidates re-scored per result")
+    parser.add_argument("--prompts", default="prompts.text")
+    parser.add_argument("--synthetic", type=int, help="use N noisy stored vectors as queries")
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report here")
+    args = parser.parse_args()
+
+    report = run(args)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
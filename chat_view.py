@@ -0,0 +1,156 @@
+import streamlit as st
+
+from job_queue import JobQueue
+from rag_engine import CANCELLED_ANSWER
+
+# Number of (query, answer) pairs drawn on a full rerun; older ones load on demand
+CHAT_WINDOW = 20
+
+USER_MESSAGE = """
+<div class="chat-message chat-message-user">
+    <div class="chat-message-avatar chat-message-avatar-user">U</div>
+    <div class="chat-message-content">{content}</div>
+</div>
+"""
+
+BOT_MESSAGE = """
+<div class="chat-message chat-message-bot">
+    <div class="chat-message-avatar chat-message-avatar-bot">N</div>
+    <div class="chat-message-content">{content}</div>
+</div>
+"""
+
+TYPING_INDICATOR = BOT_MESSAGE.format(content='<div class="spinner"></div>')
+
+# How often a session with answers in flight checks the job queue, in seconds
+JOB_POLL_INTERVAL = 0.5
+JOB_WORKERS = 4
+
+
+def pair_html(query, answer):
+    html = USER_MESSAGE.format(content=query)
+    if answer:
+        html += BOT_MESSAGE.format(content=answer)
+    return html
+
+
+def reset_window():
+    st.session_state.chat_window = CHAT_WINDOW
+
+
+def render_transcript(conversation):
+    # Draw only the latest window, one element per pair instead of two. Pairs from the
+    # first unanswered one on are left to the input fragment, which fills in answers as
+    # they arrive without a full rerun
+    window = st.session_state.setdefault("chat_window", CHAT_WINDOW)
+    upto = min(in_flight(), default=len(conversation))
+    hidden = min(max(len(conversation) - window, 0), upto)
+    if hidden:
+        if st.button(f"Show {min(hidden, CHAT_WINDOW)} earlier messages", key="load_earlier"):
+            st.session_state.chat_window = window + CHAT_WINDOW
+            st.rerun()
+    for query, answer in conversation[hidden:upto]:
+        st.markdown(pair_html(query, answer), unsafe_allow_html=True)
+    st.session_state.rendered_upto = upto
+
+
+def render_pending(job_queue, conversation):
+    # Messages the last full rerun didn't draw: sent since, or still being answered.
+    # Unanswered ones get a typing indicator and a cancel button
+    waiting = in_flight()
+    settled = min(waiting, default=len(conversation))
+    if settled - st.session_state.get("rendered_upto", 0) > CHAT_WINDOW:
+        # Hand answered messages to the transcript, which draws only the latest window,
+        # instead of redrawing a growing backlog on every fragment run. A full rerun
+        # moves rendered_upto to `settled`, so this fires once per CHAT_WINDOW messages
+        st.rerun()
+    for index in range(st.session_state.get("rendered_upto", 0), len(conversation)):
+        query, answer = conversation[index]
+        st.markdown(pair_html(query, answer), unsafe_allow_html=True)
+        if index in waiting:
+            st.markdown(TYPING_INDICATOR, unsafe_allow_html=True)
+            st.button("Cancel", key=f"cancel_{waiting[index]}", on_click=cancel_job,
+                      args=(job_queue, waiting[index]))
+
+
+# ====== Background answers ======
+@st.cache_resource(show_spinner=False)
+def get_job_queue():
+    return JobQueue(max_workers=JOB_WORKERS)
+
+
+def pending_jobs():
+    # job_id -> (chat_id, message index) for answers still being generated
+    return st.session_state.setdefault("pending_jobs", {})
+
+
+def in_flight():
+    # message index -> job_id for the current chat's answers still being generated
+    return {index: job_id for job_id, (chat_id, index) in pending_jobs().items()
+            if chat_id == st.session_state.current_chat}
+
+
+def poll_interval():
+    # run_every for the input fragment, evaluated on full runs only. Answers in flight
+    # at a full run are polled by run_every until the next one (Streamlit can't stop
+    # it sooner); answers submitted later by the fragment rerunning itself
+    st.session_state.fragment_full_run = True
+    st.session_state.interval_polling = bool(pending_jobs())
+    return JOB_POLL_INTERVAL if st.session_state.interval_polling else None
+
+
+def wait_for_answers(job_queue):
+    # Last call in the input fragment: with answers in flight and no run_every, wait up
+    # to one poll interval for one to finish, then rerun just the fragment
+    full_run = st.session_state.pop("fragment_full_run", False)
+    if st.session_state.get("interval_polling"):
+        if not pending_jobs():
+            # Only a full rerun stops run_every, and nothing is left to poll for
+            st.rerun()
+        return
+    if not pending_jobs():
+        return
+    job_queue.wait(list(pending_jobs()), JOB_POLL_INTERVAL)
+    # A question submitted during a full run (a rerun merged with the form) can't
+    # rerun only the fragment
+    st.rerun(scope="app" if full_run else "fragment")
+
+
+def submit_question(job_queue, query, fn, *args, **kwargs):
+    # Queue the answer and leave an empty slot in the conversation for it
+    st.session_state.conversation.append((query, ""))
+    st.session_state.chat_history[st.session_state.current_chat] = st.session_state.conversation
+    job_id = job_queue.submit(fn, *args, **kwargs)
+    pending_jobs()[job_id] = (st.session_state.current_chat, len(st.session_state.conversation) - 1)
+    return job_id
+
+
+def fill_answer(chat_id, index, answer):
+    # Chats switched away from still get their answer
+    messages = st.session_state.chat_history.get(chat_id)
+    if messages is not None and index < len(messages):
+        messages[index] = (messages[index][0], answer)
+
+
+def collect_jobs(job_queue):
+    finished = False
+    for job_id, (chat_id, index) in list(pending_jobs().items()):
+        if not job_queue.done(job_id):
+            continue
+        try:
+            answer = job_queue.result(job_id) or CANCELLED_ANSWER
+        except Exception as e:
+            answer = f"An error occurred: {str(e)}"
+        fill_answer(chat_id, index, answer)
+        del pending_jobs()[job_id]
+        finished = True
+    return finished
+
+
+def cancel_job(job_queue, job_id):
+    if job_id not in pending_jobs():
+        return
+    chat_id, index = pending_jobs().pop(job_id)
+    job_queue.cancel(job_id)
+    fill_answer(chat_id, index, CANCELLED_ANSWER)
+
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:  # Windows: only one process may write to a cache directory at a time
+    fcntl = None
+
+# Content-addressed cache: sha256(model name + chunk text) -> row in a float32 matrix.
+# Vectors live in an append-only raw file read back through np.memmap, and keys in a
+# small JSON index, so rebuilding a store only encodes text that has never been seen.
+#
+# The index is the source of truth: rows past it in the vector file are leftovers of an
+# interrupted write and are cut off before the next append. Writers (ingest runs, apps
+# building their stores) serialize on a lock file, and each re-reads the index under it.
+
+VECTORS_FILE = "vectors.f32"
+INDEX_FILE = "index.json"
+LOCK_FILE = "lock"
+
+
+def content_key(model_name, text):
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir, model_name):
+        # One subdirectory per model, since vector sizes differ between models
+        self.cache_dir = os.path.join(cache_dir, model_name.replace("/", "_"))
+        self.model_name = model_name
+        self.lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.vectors_path = os.path.join(self.cache_dir, VECTORS_FILE)
+        self.index_path = os.path.join(self.cache_dir, INDEX_FILE)
+        self.lock_path = os.path.join(self.cache_dir, LOCK_FILE)
+        self.dim = None
+        self.rows = {}
+        self.matrix = None
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                index = json.load(f)
+            self.dim = index["dim"]
+            self.rows = index["rows"]
+        self._remap()
+
+    @contextmanager
+    def _write_lock(self):
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _remap(self):
+        if self.dim and self.rows and os.path.exists(self.vectors_path):
+            self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                    shape=(len(self.rows), self.dim))
+        else:
+            self.matrix = None
+
+    def get_many(self, texts):
+        keys = [content_key(self.model_name, text) for text in texts]
+        found = {}
+        for i, key in enumerate(keys):
+            row = self.rows.get(key)
+            if row is not None and self.matrix is not None:
+                found[i] = np.array(self.matrix[row])
+        return keys, found
+
+    def put_many(self, keys, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self.lock, self._write_lock():
+            # Another process may have appended since this one last looked
+            self._load()
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+            new = []
+            for key, vector in zip(keys, vectors):
+                if key not in self.rows:
+                    self.rows[key] = len(self.rows)
+                    new.append(vector)
+            if not new:
+                return
+            with open(self.vectors_path, "ab") as f:
+                # Drop orphaned rows so the new ones land where the index will point
+                f.truncate((len(self.rows) - len(new)) * self.dim * 4)
+                f.write(np.stack(new).astype(np.float32).tobytes())
+            # Write the index after the vectors so a crash never points past the data
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"model": self.model_name, "dim": self.dim, "rows": self.rows}, f)
+            os.replace(tmp_path, self.index_path)
+            self._remap()
+
+
+class CachedEmbeddings(Embeddings):
+    # Drop-in wrapper for any LangChain embeddings object; only document
+    # embeddings are cached, queries are encoded fresh every time
+    def __init__(self, embeddings, model_name, cache_dir="./embedding_cache"):
+        self.embeddings = embeddings
+        self.cache = EmbeddingCache(cache_dir, model_name)
+
+    def embed_documents(self, texts):
+        keys, found = self.cache.get_many(texts)
+        # Encode each unseen text once, even if it repeats within the batch
+        missing = {}
+        for i in range(len(texts)):
+            if i not in found:
+                missing.setdefault(keys[i], i)
+        if missing:
+            vectors = self.embeddings.embed_documents([texts[i] for i in missing.values()])
+            self.cache.put_many(list(missing), vectors)
+            by_key = dict(zip(missing, np.asarray(vectors, dtype=np.float32)))
+            for i in range(len(texts)):
+                if i not in found:
+                    found[i] = by_key[keys[i]]
+        return [found[i].tolist() for i in range(len(texts))]
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
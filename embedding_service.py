@@ -0,0 +1,94 @@
+import functools
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from langchain_core.embeddings import Embeddings
+
+# Micro-batching for query embeddings. Concurrent embed_query calls are collected for a
+# few milliseconds and encoded as one batch, so MiniLM runs a single wide matmul instead
+# of many batch-of-one passes competing for the same cores.
+
+BATCH_WINDOW = float(os.environ.get("NOVA_EMBED_BATCH_WINDOW_MS", "5")) / 1000.0
+MAX_BATCH = int(os.environ.get("NOVA_EMBED_MAX_BATCH", "32"))
+
+
+def configure_torch_threads(num_threads=None):
+    # One intra-op pool sized to the cores, and no extra inter-op pool; with a single
+    # encoder thread there is nothing left to oversubscribe
+    try:
+        import torch
+    except ImportError:
+        return
+    num_threads = num_threads or int(os.environ.get("NOVA_TORCH_THREADS", "0")) or os.cpu_count() or 1
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only allowed before torch has started any parallel work
+        pass
+
+
+class BatchingEmbeddings(Embeddings):
+    def __init__(self, embeddings, batch_window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.embeddings = embeddings
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._start()
+        # Threads don't survive fork; a pre-forked worker gets its own batcher
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self.pending = []
+        self.cond = threading.Condition()
+        self.worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self.worker.start()
+
+    def embed_documents(self, texts):
+        # Ingest already sends large batches
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        future = Future()
+        with self.cond:
+            self.pending.append((text, future))
+            self.cond.notify()
+        return future.result()
+
+    def _next_batch(self):
+        with self.cond:
+            while not self.pending:
+                self.cond.wait()
+            # Hold the first request for up to one window while others arrive
+            deadline = time.monotonic() + self.batch_window
+            while len(self.pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            batch, self.pending = self.pending[:self.max_batch], self.pending[self.max_batch:]
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                # Identical concurrent queries are encoded once
+                texts = list(dict.fromkeys(text for text, future in batch))
+                vectors = dict(zip(texts, self.embeddings.embed_documents(texts)))
+                for text, future in batch:
+                    future.set_result(vectors[text])
+            except Exception as e:
+                for text, future in batch:
+                    future.set_exception(e)
+
+
+@functools.lru_cache(maxsize=None)
+def shared_embeddings(model_name="all-MiniLM-L6-v2"):
+    # One model and one batcher per process, however many sessions or reruns ask for it
+    from langchain_community.embeddings import SentenceTransformerEmbeddings
+
+    configure_torch_threads()
+    return BatchingEmbeddings(SentenceTransformerEmbeddings(model_name=model_name))
@@ -0,0 +1,122 @@
+import json
+import os
+
+import numpy as np
+
+from index_snapshot import matches
+
+# One row per FAQ question or curated paraphrase, each pointing back at its entry.
+# Matching against the question alone gives much sharper scores than the mixed
+# question+answer text stored in the Chroma JSON collection.
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class FaqIndex:
+    def __init__(self, vectors, owners, entries, embeddings=None, metadata=None):
+        self.vectors = normalize_rows(vectors)
+        self.owners = np.asarray(owners, dtype=np.int32)
+        self.entries = entries
+        self.embeddings = embeddings
+        # Per entry, the same metadata its chunk carries in the Chroma JSON store, so
+        # searches take the same where clauses
+        self.metadata = metadata
+
+    @classmethod
+    def build(cls, entries, embeddings):
+        texts, owners = [], []
+        for i, entry in enumerate(entries):
+            for text in [entry["question"]] + list(entry.get("paraphrases", [])):
+                texts.append(text)
+                owners.append(i)
+        vectors = embeddings.embed_documents(texts)
+        from ingest import with_metadata
+
+        metadata = [with_metadata({}, "json", entry) for entry in entries]
+        return cls(vectors, owners, entries, embeddings, metadata)
+
+    @classmethod
+    def from_json(cls, data_path, embeddings):
+        with open(data_path, encoding="utf-8") as f:
+            return cls.build(json.load(f), embeddings)
+
+    def save(self, index_path):
+        np.savez(
+            index_path,
+            vectors=self.vectors,
+            owners=self.owners,
+            entries=np.array(json.dumps(self.entries)),
+            metadata=np.array(json.dumps(self.metadata)),
+        )
+
+    @classmethod
+    def load(cls, index_path, embeddings=None):
+        data = np.load(index_path)
+        metadata = json.loads(str(data["metadata"])) if "metadata" in data else None
+        return cls(data["vectors"], data["owners"], json.loads(str(data["entries"])), embeddings, metadata)
+
+    @classmethod
+    def load_current(cls, data_path, index_path, embeddings=None):
+        # The saved index, or None when it is missing, older than the FAQ file, or
+        # predates stored metadata. Loading encodes nothing
+        if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(data_path):
+            index = cls.load(index_path, embeddings)
+            if index.metadata is not None:
+                return index
+        return None
+
+    @classmethod
+    def load_or_build(cls, data_path, index_path, embeddings):
+        index = cls.load_current(data_path, index_path, embeddings)
+        if index is not None:
+            return index
+        index = cls.from_json(data_path, embeddings)
+        index.save(index_path)
+        return index
+
+    def search_vector(self, query_vector, k=3, threshold=0.0, filter=None):
+        # filter is a Chroma where clause, as rag_engine.build_where makes for the stores
+        allowed = None
+        if filter:
+            allowed = {i for i, metadata in enumerate(self.metadata) if matches(metadata, filter)}
+        scores = self.vectors @ normalize_rows(query_vector)[0]
+        # Best score per entry, so paraphrases don't crowd out other answers
+        best = {}
+        for row in np.argsort(-scores):
+            owner = int(self.owners[row])
+            if allowed is not None and owner not in allowed:
+                continue
+            if owner not in best:
+                best[owner] = float(scores[row])
+            if len(best) == k:
+                break
+        return [(self.entries[i], score) for i, score in best.items() if score >= threshold]
+
+    def search(self, user_query, k=3, threshold=0.0, filter=None):
+        return self.search_vector(self.embeddings.embed_query(user_query), k, threshold, filter)
+
+
+def entry_text(entry):
+    return f"Question: {entry['question']}\nAnswer: {entry['answer']}"
+
+
+if __name__ == "__main__":
+    # Build step for processes that must not encode at startup (prefork_server.py)
+    import argparse
+
+    from embedding_service import shared_embeddings
+
+    parser = argparse.ArgumentParser(description="Build the FAQ question index")
+    parser.add_argument("--data", default="./company_policies.json")
+    parser.add_argument("--out", default="./faq_index.npz")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    args = parser.parse_args()
+    index = FaqIndex.load_or_build(args.data, args.out, shared_embeddings(args.model))
+    print(f"{len(index.owners)} FAQ questions -> {args.out}")
@@ -0,0 +1,115 @@
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+# Versioned index holder for long-running app processes. A background thread watches
+# <root>/CURRENT, loads the version it names, and swaps it in for new requests.
+# Requests already holding the old version finish on it; it is closed once drained.
+
+CURRENT_FILE = "CURRENT"
+
+logger = logging.getLogger(__name__)
+
+
+class IndexNotReady(RuntimeError):
+    pass
+
+
+class IndexVersion:
+    def __init__(self, version, stores, faq_index=None):
+        # The FAQ index is swapped together with the stores it was built alongside
+        self.version = version
+        self.stores = stores
+        self.faq_index = faq_index
+        self.refs = 0
+        self.retired = False
+
+    def close(self):
+        for store in self.stores:
+            if hasattr(store, "close"):
+                store.close()
+
+
+class IndexManager:
+    def __init__(self, root, loader, poll_interval=5.0):
+        # loader(version_dir) -> (tuple of stores, FAQ index or None), e.g.
+        # index_snapshot.open_version
+        self.root = root
+        self.loader = loader
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.active = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def current_version(self):
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load(self, version):
+        stores, faq_index = self.loader(os.path.join(self.root, version))
+        return IndexVersion(version, tuple(stores), faq_index)
+
+    def start(self, initial=None, initial_faq_index=None, initial_version="local"):
+        # Serve `initial` stores until a snapshot has been published
+        version = self.current_version()
+        if version:
+            self.swap(self.load(version))
+        elif initial is not None:
+            self.swap(IndexVersion(initial_version, tuple(initial), initial_faq_index))
+        self.thread = threading.Thread(target=self._watch, name="index-manager", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+    def _watch(self):
+        while not self.stopped.wait(self.poll_interval):
+            try:
+                self.reload()
+            except Exception:
+                # Keep serving the current version; the next poll retries
+                logger.exception("Index reload failed")
+
+    def reload(self):
+        version = self.current_version()
+        if not version or (self.active and self.active.version == version):
+            return False
+        # Loading happens outside the lock so requests keep flowing meanwhile
+        self.swap(self.load(version))
+        return True
+
+    def swap(self, new):
+        drained = False
+        with self.lock:
+            old, self.active = self.active, new
+            if old is not None:
+                old.retired = True
+                drained = old.refs == 0
+        if drained:
+            old.close()
+
+    @property
+    def version(self):
+        return self.active.version if self.active else None
+
+    @contextmanager
+    def acquire(self):
+        with self.lock:
+            index = self.active
+            if index is None:
+                raise IndexNotReady("No index version is loaded yet")
+            index.refs += 1
+        try:
+            yield index
+        finally:
+            with self.lock:
+                index.refs -= 1
+                drained = index.retired and index.refs == 0
+            if drained:
+                index.close()
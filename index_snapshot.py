@@ -0,0 +1,287 @@
+import argparse
+import json
+import math
+import mmap
+import os
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+# Read-only export of a Chroma collection that any number of processes can mmap.
+# Pages are shared through the OS page cache, so replicas on one host don't each
+# hold a private copy of the HNSW segment and startup is just a few opens.
+#
+#   manifest.json  count, dim, model, created
+#   vectors.f32    count x dim float32, L2-normalized
+#   records.jsonl  one {"id", "text", "metadata"} object per line
+#   offsets.u64    count + 1 byte offsets into records.jsonl
+#   vectors.i8     count x dim int8 codes, per-dimension symmetric scale
+#   scales.f32     dim float32 scales; vector ~= code * scale
+#
+# With NOVA_SNAPSHOT_INT8=1 searches scan the int8 codes (a quarter of the memory)
+# and re-score the best candidates exactly from the float32 file, which is then only
+# paged in for those rows.
+
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.f32"
+RECORDS_FILE = "records.jsonl"
+OFFSETS_FILE = "offsets.u64"
+CODES_FILE = "vectors.i8"
+SCALES_FILE = "scales.f32"
+# Per version, next to the store directories
+FAQ_INDEX_FILE = "faq_index.npz"
+
+USE_INT8 = os.environ.get("NOVA_SNAPSHOT_INT8", "0") == "1"
+# Candidates re-scored at full precision, per result requested
+RESCORE_FACTOR = int(os.environ.get("NOVA_SNAPSHOT_RESCORE", "8"))
+# Rows decoded per block while scanning codes, bounding the temporary float copy
+SCAN_BLOCK = 65536
+
+
+def quantize(vectors):
+    # Symmetric int8 per dimension; returns (codes, scales)
+    scales = np.abs(vectors).max(axis=0) / 127.0 if len(vectors) else np.ones(vectors.shape[1], np.float32)
+    scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scales), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def export_snapshot(db, out_dir, model_name="all-MiniLM-L6-v2"):
+    # Snapshots are immutable once written, since readers may have them mapped; a changed
+    # index is exported as a new version and switched to with publish_snapshot
+    if os.path.exists(out_dir):
+        raise FileExistsError(f"{out_dir} already exists; export a new version instead")
+    data = db.get(include=["embeddings", "documents", "metadatas"])
+    vectors = np.asarray(data["embeddings"], dtype=np.float32)
+    # An empty store comes back as a 1-D empty array; keep it count x dim
+    vectors = vectors.reshape(len(data["ids"]), vectors.shape[1] if vectors.ndim == 2 else 0)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors = vectors / norms
+
+    # Build next to the target and swap in at the end so readers never see a partial snapshot
+    tmp_dir = out_dir.rstrip("/") + f".tmp-{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    vectors.tofile(os.path.join(tmp_dir, VECTORS_FILE))
+    codes, scales = quantize(vectors)
+    codes.tofile(os.path.join(tmp_dir, CODES_FILE))
+    scales.tofile(os.path.join(tmp_dir, SCALES_FILE))
+    offsets = [0]
+    with open(os.path.join(tmp_dir, RECORDS_FILE), "wb") as f:
+        for doc_id, text, metadata in zip(data["ids"], data["documents"], data["metadatas"]):
+            line = json.dumps({"id": doc_id, "text": text, "metadata": metadata or {}}) + "\n"
+            f.write(line.encode("utf-8"))
+            offsets.append(offsets[-1] + len(line.encode("utf-8")))
+    np.asarray(offsets, dtype=np.uint64).tofile(os.path.join(tmp_dir, OFFSETS_FILE))
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "count": int(vectors.shape[0]),
+            "dim": int(vectors.shape[1]),
+            "model": model_name,
+            "created": time.time(),
+        }, f)
+
+    # rename, not replace: fails rather than clobbering a snapshot exported meanwhile
+    os.rename(tmp_dir, out_dir)
+    return out_dir
+
+
+def matches(metadata, where):
+    # Enough of Chroma's where syntax for the filters rag_engine builds
+    if not where:
+        return True
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(matches(metadata, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(matches(metadata, c) for c in cond):
+                return False
+        elif isinstance(cond, dict):
+            if "$in" in cond and metadata.get(key) not in cond["$in"]:
+                return False
+            if "$eq" in cond and metadata.get(key) != cond["$eq"]:
+                return False
+            if "$ne" in cond and metadata.get(key) == cond["$ne"]:
+                return False
+        elif metadata.get(key) != cond:
+            return False
+    return True
+
+
+def top_k(scores, k):
+    # (row, score) for the k best finite scores, best first
+    k = min(k, len(scores))
+    if k <= 0:
+        return []
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [(int(row), float(scores[row])) for row in top if np.isfinite(scores[row])]
+
+
+class SnapshotIndex:
+    # Exposes the Chroma search method rag_engine uses, backed by mmapped files
+    def __init__(self, snapshot_dir, embeddings, use_int8=None):
+        self.snapshot_dir = snapshot_dir
+        self.embeddings = embeddings
+        with open(os.path.join(snapshot_dir, MANIFEST_FILE), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        count, dim = self.manifest["count"], self.manifest["dim"]
+        self.vectors = np.memmap(os.path.join(snapshot_dir, VECTORS_FILE), dtype=np.float32,
+                                 mode="r", shape=(count, dim)) if count else np.zeros((0, dim), np.float32)
+        self.offsets = np.memmap(os.path.join(snapshot_dir, OFFSETS_FILE), dtype=np.uint64, mode="r")
+        self._records_file = open(os.path.join(snapshot_dir, RECORDS_FILE), "rb")
+        self.records = mmap.mmap(self._records_file.fileno(), 0, access=mmap.ACCESS_READ) if count else b""
+        self._metadatas = None
+        # Snapshots exported before quantization was added have no codes
+        if use_int8 is None:
+            use_int8 = USE_INT8
+        self.codes = self.scales = None
+        if use_int8 and count and os.path.exists(os.path.join(snapshot_dir, CODES_FILE)):
+            self.codes = np.memmap(os.path.join(snapshot_dir, CODES_FILE), dtype=np.int8,
+                                   mode="r", shape=(count, dim))
+            self.scales = np.fromfile(os.path.join(snapshot_dir, SCALES_FILE), dtype=np.float32)
+
+    def __len__(self):
+        return self.manifest["count"]
+
+    def record(self, row):
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return json.loads(self.records[start:end])
+
+    def metadatas(self):
+        # Parsed lazily, only once a filtered search needs them
+        if self._metadatas is None:
+            self._metadatas = [self.record(row)["metadata"] for row in range(len(self))]
+        return self._metadatas
+
+    def search_vector(self, query_vector, k=4, filter=None):
+        if not len(self):
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        if self.codes is not None:
+            return self.search_codes(query, k, filter)
+        scores = self.vectors @ query
+        if filter:
+            scores = np.where(self.allowed(filter), scores, -np.inf)
+        return top_k(scores, k)
+
+    def allowed(self, filter):
+        return np.array([matches(m, filter) for m in self.metadatas()])
+
+    def search_codes(self, query, k, filter=None, rescore_factor=RESCORE_FACTOR):
+        # Approximate scores from the int8 codes, then exact scores for the best candidates;
+        # query must already be unit length
+        scaled = query * self.scales
+        approx = np.concatenate([
+            self.codes[start:start + SCAN_BLOCK].astype(np.float32) @ scaled
+            for start in range(0, len(self), SCAN_BLOCK)
+        ])
+        if filter:
+            approx = np.where(self.allowed(filter), approx, -np.inf)
+        candidates = np.array([row for row, score in top_k(approx, k * rescore_factor)], dtype=np.int64)
+        if not len(candidates):
+            return []
+        candidates.sort()  # sequential reads from the float32 file
+        exact = self.vectors[candidates] @ query
+        return [(int(candidates[i]), score) for i, score in top_k(exact, k)]
+
+    def similarity_search_with_relevance_scores(self, query, k=4, filter=None):
+        results = []
+        for row, cosine in self.search_vector(self.embeddings.embed_query(query), k, filter):
+            record = self.record(row)
+            # Same scale as Chroma's default squared-L2 relevance, so thresholds carry over
+            relevance = 1.0 - (2.0 - 2.0 * cosine) / math.sqrt(2)
+            results.append((Document(page_content=record["text"], metadata=record["metadata"]), relevance))
+        return results
+
+    def similarity_search_by_vector_with_relevance_scores(self, embedding, k=4, filter=None):
+        # Like Chroma's method of this name, scores here are squared L2 distances
+        return [
+            (Document(page_content=record["text"], metadata=record["metadata"]), 2.0 - 2.0 * cosine)
+            for record, cosine in ((self.record(row), cosine) for row, cosine in self.search_vector(embedding, k, filter))
+        ]
+
+    def close(self):
+        if isinstance(self.records, mmap.mmap):
+            self.records.close()
+        self._records_file.close()
+
+
+def open_stores(snapshot_dir, embeddings):
+    # A unified export is one store serving both sources (see rag_engine.search_unified)
+    if os.path.isdir(os.path.join(snapshot_dir, "all")):
+        store = SnapshotIndex(os.path.join(snapshot_dir, "all"), embeddings)
+        return store, store
+    return (
+        SnapshotIndex(os.path.join(snapshot_dir, "json"), embeddings),
+        SnapshotIndex(os.path.join(snapshot_dir, "pdf"), embeddings),
+    )
+
+
+def open_version(version_dir, embeddings):
+    # (stores, FAQ index) for one published version; versions exported without a FAQ
+    # index answer FAQ questions from the JSON store
+    faq_index = None
+    if os.path.exists(os.path.join(version_dir, FAQ_INDEX_FILE)):
+        from faq_index import FaqIndex
+
+        faq_index = FaqIndex.load(os.path.join(version_dir, FAQ_INDEX_FILE), embeddings)
+    return open_stores(version_dir, embeddings), faq_index
+
+
+def snapshot_version(snapshot_dir):
+    # index_version for a process serving one exported version directory: the name it
+    # was published under (the key precompute_answers.py caches by), or "local" for
+    # the Chroma stores
+    return os.path.basename(os.path.normpath(snapshot_dir)) if snapshot_dir else "local"
+
+
+def publish_snapshot(root, version):
+    # Point <root>/CURRENT at a fully exported version; index_manager picks it up
+    tmp_path = os.path.join(root, f"CURRENT.tmp-{os.getpid()}")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(root, "CURRENT"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export Chroma stores as read-only mmap snapshots")
+    parser.add_argument("--json-db", default="./json_db")
+    parser.add_argument("--pdf-db", default="./pdf_db")
+    parser.add_argument("--root", default="./snapshots")
+    parser.add_argument("--version", default=time.strftime("%Y%m%d-%H%M%S"))
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--unified-db", help="export this single-collection store instead (unify_stores.py)")
+    parser.add_argument("--faq-data", default="./company_policies.json",
+                        help="FAQ file to build the version's FAQ index from; '' to skip")
+    parser.add_argument("--no-publish", action="store_true", help="export without switching CURRENT")
+    args = parser.parse_args()
+
+    from langchain_community.vectorstores import Chroma
+
+    from ingest import UNIFIED_COLLECTION
+
+    version_dir = os.path.join(args.root, args.version)
+    if os.path.exists(version_dir):
+        parser.error(f"version {args.version} already exists under {args.root}")
+    if args.unified_db:
+        stores = (("all", args.unified_db, UNIFIED_COLLECTION),)
+    else:
+        stores = (("json", args.json_db, "langchain"), ("pdf", args.pdf_db, "langchain"))
+    for name, db_path, collection_name in stores:
+        db = Chroma(collection_name=collection_name, persist_directory=db_path)
+        path = export_snapshot(db, os.path.join(version_dir, name), args.model)
+        print(f"Exported {db_path} -> {path}")
+    if args.faq_data:
+        from embedding_service import shared_embeddings
+        from faq_index import FaqIndex
+
+        faq_path = os.path.join(version_dir, FAQ_INDEX_FILE)
+        FaqIndex.from_json(args.faq_data, shared_embeddings(args.model)).save(faq_path)
+        print(f"Built {args.faq_data} -> {faq_path}")
+    if not args.no_publish:
+        publish_snapshot(args.root, args.version)
+        print(f"Published version {args.version}")
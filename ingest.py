@@ -0,0 +1,121 @@
+import json
+import os
+
+from langchain_community.document_loaders import JSONLoader, PyPDFLoader
+from langchain.text_splitter import TokenTextSplitter
+from langchain_community.vectorstores import Chroma
+
+# Metadata keys attached to every chunk so searches can be narrowed with a filter
+METADATA_FIELDS = ("doc_type", "department", "region", "effective_date", "version")
+
+# Per-source defaults; JSON entries may override any of these with their own fields
+SOURCE_METADATA = {
+    "json": {
+        "source_type": "json",
+        "doc_type": "faq",
+        "department": "HR",
+        "region": "All",
+        "effective_date": "",
+        "version": "1",
+    },
+    "pdf": {
+        "source_type": "pdf",
+        "doc_type": "handbook",
+        "department": "HR",
+        "region": "All",
+        "effective_date": "",
+        "version": "V4",
+    },
+}
+
+JSON_JQ_SCHEMA = ".[] | {question: .question, answer: .answer}"
+
+# All sources in one collection, told apart by the source_type metadata key
+UNIFIED_COLLECTION = "nova"
+
+
+def with_metadata(metadata, source_type, overrides=None):
+    # Chroma only stores str/int/float/bool values, so fill every key
+    merged = dict(SOURCE_METADATA[source_type])
+    for key in METADATA_FIELDS:
+        if overrides and overrides.get(key) not in (None, ""):
+            merged[key] = str(overrides[key])
+    metadata.update(merged)
+    return metadata
+
+
+#load json
+def load_json(file_path, jq_schema=JSON_JQ_SCHEMA):
+    # Per-entry metadata fields are read from the raw file because the jq
+    # schema deliberately leaves them out of the page content
+    with open(file_path, encoding="utf-8") as f:
+        entries = json.load(f)
+    docs = JSONLoader(file_path=file_path, jq_schema=jq_schema, text_content=False).load()
+    for doc, entry in zip(docs, entries):
+        with_metadata(doc.metadata, "json", entry)
+    return docs
+
+
+#load pdf
+def load_pdf(file_path):
+    docs = PyPDFLoader(file_path).load()
+    for doc in docs:
+        with_metadata(doc.metadata, "pdf")
+    return docs
+
+
+#split the text
+def process_data(docs, chunk_size=300, chunk_overlap=40):
+    splitter = TokenTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = splitter.split_documents(docs)
+    # Stable IDs in document order (file, page or entry number, chunk within it),
+    # used to order context canonically in prompts
+    counters = {}
+    for chunk in chunks:
+        source = os.path.basename(str(chunk.metadata.get("source", "")))
+        location = int(chunk.metadata.get("page", chunk.metadata.get("seq_num", 0)))
+        n = counters.get((source, location), 0)
+        counters[(source, location)] = n + 1
+        chunk.metadata["chunk_id"] = f"{source}:{location:05d}:{n:03d}"
+    return chunks
+
+
+def load_source(source_type, config):
+    if source_type == "json":
+        return load_json(config["data_path"], config.get("jq_schema", JSON_JQ_SCHEMA))
+    return load_pdf(config["data_path"])
+
+
+def build_vector_store(source_type, config, embeddings):
+    chunks = process_data(load_source(source_type, config))
+    vector_db = Chroma.from_documents(
+        documents=chunks,
+        embedding=embeddings,
+        persist_directory=config["db_path"]
+    )
+    vector_db.persist()
+    return vector_db
+
+
+def build_unified_store(configs, db_path, embeddings):
+    # configs: {"json": {...}, "pdf": {...}} as for build_vector_store
+    chunks = []
+    for source_type, config in configs.items():
+        chunks.extend(process_data(load_source(source_type, config)))
+    vector_db = Chroma.from_documents(
+        documents=chunks,
+        embedding=embeddings,
+        ids=[chunk.metadata["chunk_id"] for chunk in chunks],
+        collection_name=UNIFIED_COLLECTION,
+        persist_directory=db_path
+    )
+    vector_db.persist()
+    return vector_db
+
+
+def open_unified_store(db_path, embeddings):
+    return Chroma(
+        collection_name=UNIFIED_COLLECTION,
+        persist_directory=db_path,
+        embedding_function=embeddings
+    )
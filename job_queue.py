@@ -0,0 +1,80 @@
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Per-process worker pool for answers. Jobs outlive the Streamlit script run that
+# submitted them, so a rerun ("New chat", theme toggle, ...) no longer throws away
+# an LLM call halfway through; the session collects the result on a later run.
+
+# Finished jobs nobody collected (closed tabs) are dropped after this long
+JOB_TTL = 600
+
+
+class Job:
+    def __init__(self, job_id, future, cancel_event):
+        self.job_id = job_id
+        self.future = future
+        self.cancel_event = cancel_event
+        self.submitted = time.time()
+
+    @property
+    def status(self):
+        if self.cancel_event.is_set():
+            return "cancelled"
+        if self.future.done():
+            return "failed" if self.future.exception() else "done"
+        return "running" if self.future.running() else "queued"
+
+
+class JobQueue:
+    def __init__(self, max_workers=4):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nova-job")
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        # fn receives a cancel_event keyword so it can stop before expensive stages
+        self.prune()
+        cancel_event = threading.Event()
+        future = self.executor.submit(fn, *args, cancel_event=cancel_event, **kwargs)
+        job = Job(uuid.uuid4().hex, future, cancel_event)
+        with self.lock:
+            self.jobs[job.job_id] = job
+        return job.job_id
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def done(self, job_id):
+        job = self.get(job_id)
+        return job is None or job.future.done() or job.cancel_event.is_set()
+
+    def wait(self, job_ids, timeout):
+        # Until one of the jobs finishes or timeout seconds pass
+        futures = [job.future for job in map(self.get, job_ids) if job is not None]
+        if futures:
+            wait(futures, timeout, return_when=FIRST_COMPLETED)
+
+    def result(self, job_id):
+        # Collect and forget a finished job
+        with self.lock:
+            job = self.jobs.pop(job_id, None)
+        if job is None or job.cancel_event.is_set():
+            return None
+        return job.future.result()
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return False
+        job.cancel_event.set()
+        job.future.cancel()
+        return True
+
+    def prune(self):
+        cutoff = time.time() - JOB_TTL
+        with self.lock:
+            for job_id in [j for j, job in self.jobs.items() if job.future.done() and job.submitted < cutoff]:
+                del self.jobs[job_id]
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# Chat-completion backends behind one small interface:
+#   complete(model, messages, temperature, max_tokens, timeout) -> Completion
+# Groq is the production backend; any OpenAI-compatible endpoint (including
+# mock_llm_server.py) and an in-process MockBackend let the whole pipeline run
+# and be benchmarked without network access.
+
+
+class Completion:
+    def __init__(self, text, model, prompt_tokens=0, completion_tokens=0):
+        self.text = text
+        self.model = model
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+
+class BackendError(Exception):
+    pass
+
+
+class RateLimited(BackendError):
+    pass
+
+
+class GroqBackend:
+    def __init__(self, api_key=None):
+        self.api_key = api_key
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # Created on first use, so importing an app never needs the SDK or network
+        with self._lock:
+            if self._client is None:
+                from groq import Groq
+                self._client = Groq(api_key=self.api_key)
+            return self._client
+
+    def warm(self, timeout=10):
+        # Opens the pooled TLS connection that later completions reuse
+        self.client.models.list(timeout=timeout)
+
+    def complete(self, model, messages, temperature=0.3, max_tokens=1000, timeout=None):
+        try:
+            response = self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout
+            )
+        except Exception as e:
+            if getattr(e, "status_code", None) == 429:
+                raise RateLimited(str(e)) from e
+            raise
+        usage = getattr(response, "usage", None)
+        return Completion(
+            response.choices[0].message.content,
+            model,
+            getattr(usage, "prompt_tokens", 0),
+            getattr(usage, "completion_tokens", 0),
+        )
+
+
+class OpenAICompatibleBackend:
+    # Plain HTTP against /chat/completions, e.g. vLLM, Ollama or mock_llm_server.py
+    def __init__(self, base_url, api_key=None):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+
+    def warm(self, timeout=10):
+        # urllib doesn't pool connections; this checks the endpoint answers and warms DNS
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        request = urllib.request.Request(f"{self.base_url}/models", headers=headers)
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+
+    def complete(self, model, messages, temperature=0.3, max_tokens=1000, timeout=None):
+        body = json.dumps({
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(f"{self.base_url}/chat/completions", data=body, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                data = json.load(response)
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                raise RateLimited(e.read().decode("utf-8", "replace")) from e
+            raise BackendError(f"HTTP {e.code}: {e.read().decode('utf-8', 'replace')}") from e
+        usage = data.get("usage") or {}
+        return Completion(
+            data["choices"][0]["message"]["content"],
+            data.get("model", model),
+            usage.get("prompt_tokens", 0),
+            usage.get("completion_tokens", 0),
+        )
+
+
+def count_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class MockBackend:
+    # Deterministic stand-in: the same prompt always yields the same answer. Latency is
+    # first_token_latency + completion tokens / tokens_per_second; failures are drawn
+    # from a seeded generator so a benchmark run is reproducible.
+    def __init__(self, first_token_latency=0.2, tokens_per_second=400.0, answer_tokens=60,
+                 failure_rate=0.0, rate_limit_rate=0.0, seed=0):
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def answer_for(self, model, messages, max_tokens):
+        prompt = json.dumps(messages, sort_keys=True)
+        digest = hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+        question = messages[-1]["content"].rsplit("Question:", 1)[-1].strip()
+        words = f"Mock answer {digest[:12]} to: {question}".split()
+        words += ["lorem"] * max(0, min(max_tokens, self.answer_tokens) - len(words))
+        return " ".join(words[:max(1, min(max_tokens, self.answer_tokens))])
+
+    def warm(self, timeout=10):
+        pass
+
+    def complete(self, model, messages, temperature=0.3, max_tokens=1000, timeout=None):
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            raise RateLimited("mock rate limit")
+        if roll < self.rate_limit_rate + self.failure_rate:
+            raise BackendError("mock failure")
+        text = self.answer_for(model, messages, max_tokens)
+        completion_tokens = len(text.split())
+        delay = self.first_token_latency + completion_tokens / self.tokens_per_second
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise BackendError("mock timeout")
+        time.sleep(delay)
+        prompt_tokens = sum(count_tokens(m["content"]) for m in messages)
+        return Completion(text, model, prompt_tokens, completion_tokens)
+
+
+# One backend per configuration and process: a Groq client keeps the connection warm()
+# opened, and the mock's seeded generator keeps advancing across requests, so a failure
+# rate applies across queries rather than to each query's first roll
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def cached_backend(key, factory):
+    with _backends_lock:
+        if key not in _backends:
+            _backends[key] = factory()
+        return _backends[key]
+
+
+# Keys the Streamlit apps have always used, by script; an app keeps its own account
+# unless GROQ_API_KEY says otherwise
+APP_GROQ_API_KEYS = {
+    "MIT_Nova.py": "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",
+    "MIT_Nova_1.py": "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",
+    "MIT_Nova_local_host.py": "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",
+    "MIT_Nova_streamlit.py": "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",
+}
+# Secrets files searched for GROQ_API_KEY by everything else
+SECRETS_FILES = ("./.streamlit/secrets.toml", "./secrets.toml")
+
+
+def resolve_groq_api_key(app=None):
+    # The one place the Groq key comes from: GROQ_API_KEY, then the key of `app` (a script
+    # path), then secrets.toml. warmup.py resolves it for the script it launches, so
+    # warm-up and the app end up with the same cached client
+    key = os.environ.get("GROQ_API_KEY")
+    if key:
+        return key
+    if app and os.path.basename(app) in APP_GROQ_API_KEYS:
+        return APP_GROQ_API_KEYS[os.path.basename(app)]
+    for path in SECRETS_FILES:
+        if os.path.exists(path):
+            import toml
+
+            key = toml.load(path).get("GROQ_API_KEY")
+            if key:
+                return key
+    return None
+
+
+def get_backend(groq_api_key=None, app=None):
+    # NOVA_LLM_BACKEND picks the provider: groq (default), openai or mock. app is the
+    # calling script, for its Groq key
+    kind = os.environ.get("NOVA_LLM_BACKEND", "groq")
+    if kind == "mock":
+        settings = (
+            float(os.environ.get("NOVA_MOCK_LATENCY", "0.2")),
+            float(os.environ.get("NOVA_MOCK_TOKENS_PER_SECOND", "400")),
+            float(os.environ.get("NOVA_MOCK_FAILURE_RATE", "0")),
+            float(os.environ.get("NOVA_MOCK_RATE_LIMIT_RATE", "0")),
+        )
+        return cached_backend(("mock",) + settings, lambda: MockBackend(
+            first_token_latency=settings[0],
+            tokens_per_second=settings[1],
+            failure_rate=settings[2],
+            rate_limit_rate=settings[3],
+        ))
+    if kind == "openai":
+        return OpenAICompatibleBackend(
+            os.environ.get("NOVA_LLM_BASE_URL", "http://127.0.0.1:8001/v1"),
+            os.environ.get("NOVA_LLM_API_KEY"),
+        )
+    api_key = groq_api_key or resolve_groq_api_key(app)
+    return cached_backend(("groq", api_key), lambda: GroqBackend(api_key=api_key))
@@ -0,0 +1,313 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+
+# Load generator: N simulated users replay prompts.text-style conversations against
+#   pipeline   rag_query_shared in this process (stores from ./json_db and ./pdf_db)
+#   http       an HTTP answer API taking {"question"} and returning {"answer"}
+#   streamlit  a running `streamlit run` server, one websocket session per user
+# The LLM defaults to the deterministic mock backend, so runs are repeatable and free.
+# (For http and streamlit targets that is the server's NOVA_LLM_BACKEND, set when starting it.)
+# Reports throughput, latency percentiles, error rate, and CPU / RSS over time.
+
+# Answer prefixes that mark a failed, empty or shed request rather than an answer
+OUTCOME_PREFIXES = {
+    "error": "An error occurred",
+    "not_found": "Sorry, I couldn't find",
+    "shed": "MIT Nova is handling a lot of questions",
+}
+
+
+def outcome(answer):
+    if not answer:
+        return "error"
+    for name, prefix in OUTCOME_PREFIXES.items():
+        if answer.startswith(prefix):
+            return name
+    return "ok"
+
+
+def load_prompts(path="prompts.text"):
+    # A query log (query_log.py) replays real questions at their real frequencies
+    if path.endswith(".jsonl"):
+        from query_log import log_files, read_records
+
+        return [r["question"] for r in read_records(log_files(path)) if r.get("question")]
+    # "12)How many days ... (note)" -> "How many days ..."
+    prompts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = re.sub(r"^\s*\d+\)\s*", "", line).strip()
+            line = re.sub(r"\s*\([^)]*\)\s*$", "", line)
+            if line:
+                prompts.append(line)
+    return prompts
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def process_sample(pid):
+    # (cpu seconds, rss bytes) from /proc; None where unavailable
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        cpu = (int(fields[11]) + int(fields[12])) / ticks
+        with open(f"/proc/{pid}/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        return cpu, rss
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class ResourceSampler(threading.Thread):
+    def __init__(self, pid, interval=1.0):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        start = time.monotonic()
+        last = None
+        while not self.stopped.is_set():
+            sample = process_sample(self.pid)
+            now = time.monotonic()
+            if sample is not None:
+                cpu, rss = sample
+                cpu_percent = None
+                if last is not None:
+                    cpu_percent = 100.0 * (cpu - last[1]) / max(now - last[0], 1e-9)
+                self.samples.append({"t": round(now - start, 2), "cpu_percent": cpu_percent, "rss_mb": rss / 2**20})
+                last = (now, cpu)
+            self.stopped.wait(self.interval)
+
+
+# ====== Targets ======
+def pipeline_target():
+    from langchain_community.vectorstores import Chroma
+
+    from embedding_service import shared_embeddings
+    from faq_index import FaqIndex
+    from llm_backends import get_backend
+    from rag_engine import rag_query_shared
+
+    embeddings = shared_embeddings("all-MiniLM-L6-v2")
+    json_db = Chroma(persist_directory="./json_db", embedding_function=embeddings)
+    pdf_db = Chroma(persist_directory="./pdf_db", embedding_function=embeddings)
+    faq_index = FaqIndex.load_or_build("./company_policies.json", "./faq_index.npz", embeddings)
+    client = get_backend()
+
+    def ask(question):
+        return rag_query_shared(json_db, pdf_db, question, client=client, faq_index=faq_index)
+    return ask
+
+
+def http_target(url, timeout):
+    def ask(question):
+        request = urllib.request.Request(url, data=json.dumps({"question": question}).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.load(response)["answer"]
+    return ask
+
+
+class StreamlitSession:
+    # One browser tab against a running `streamlit run` server, speaking the app's
+    # websocket protocol, so sessions share that server's caches and job queue like real
+    # users. Each session owns an event loop and is driven from its user's thread.
+    def __init__(self, app_url, timeout):
+        self.url = re.sub(r"^http", "ws", app_url.rstrip("/")) + "/_stcore/stream"
+        self.timeout = timeout
+        self.loop = asyncio.new_event_loop()
+        self.input_id = self.send_id = self.fragment_id = None
+        self.conn = self.loop.run_until_complete(self._connect())
+
+    async def _connect(self):
+        from tornado.websocket import websocket_connect
+
+        conn = await websocket_connect(self.url, max_message_size=2**26)
+        await self._run(conn, self._rerun_message(), time.monotonic() + self.timeout)
+        if self.input_id is None or self.send_id is None:
+            raise RuntimeError("no chat form (query_input and a Send button) on the page")
+        return conn
+
+    def _rerun_message(self, question=None):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = ""
+        if question is not None:
+            msg.rerun_script.fragment_id = self.fragment_id or ""
+            text = msg.rerun_script.widget_states.widgets.add()
+            text.id, text.string_value = self.input_id, question
+            send = msg.rerun_script.widget_states.widgets.add()
+            send.id, send.trigger_value = self.send_id, True
+        return msg.SerializeToString()
+
+    async def _run(self, conn, message, deadline):
+        # Sends one rerun and reads until a run completes; returns that run's markdown
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        conn.write_message(message, binary=True)
+        bodies = []
+        while True:
+            raw = await asyncio.wait_for(conn.read_message(), max(deadline - time.monotonic(), 0.001))
+            if raw is None:
+                raise RuntimeError("connection closed")
+            msg = ForwardMsg()
+            msg.ParseFromString(raw)
+            kind = msg.WhichOneof("type")
+            if kind == "new_session":
+                bodies = []
+            elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                element = msg.delta.new_element
+                element_type = element.WhichOneof("type")
+                if element_type == "markdown":
+                    bodies.append(element.markdown.body)
+                elif element_type == "exception":
+                    raise RuntimeError(f"app exception: {element.exception.message[:80]}")
+                elif element_type == "text_input" and element.text_input.id.endswith("query_input"):
+                    self.input_id, self.fragment_id = element.text_input.id, msg.delta.fragment_id
+                elif element_type == "button" and element.button.is_form_submitter:
+                    self.send_id = element.button.id
+            elif kind == "script_finished" and msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return bodies
+
+    async def _ask(self, question):
+        from chat_view import JOB_POLL_INTERVAL
+
+        deadline = time.monotonic() + self.timeout
+        bodies = await self._run(self.conn, self._rerun_message(question), deadline)
+        # The fragment reruns itself while the answer is in flight; poll like the
+        # browser's run_every timer would, in case this run left that to the client
+        while any('class="spinner"' in body for body in bodies):
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            bodies = await self._run(self.conn, self._rerun_message(), deadline)
+        bots = [body for body in bodies if "chat-message-bot" in body]
+        match = re.search(r'chat-message-bot">.*?chat-message-content">(.*)</div>\s*</div>\s*$',
+                          bots[-1] if bots else "", re.DOTALL)
+        return match.group(1).strip() if match else ""
+
+    def ask(self, question):
+        return self.loop.run_until_complete(self._ask(question))
+
+
+# ====== Users ======
+def simulated_user(user_id, make_ask, prompts, turns, think_time, results, stop_at, seed):
+    rng = random.Random(seed + user_id)
+    try:
+        ask = make_ask()
+    except Exception as e:
+        results.append({"user": user_id, "latency": 0.0, "outcome": "error", "error": f"session: {e}"})
+        return
+    for _ in range(turns):
+        if time.monotonic() > stop_at:
+            return
+        question = rng.choice(prompts)
+        start = time.monotonic()
+        try:
+            answer = ask(question)
+            result = outcome(answer)
+            error = answer[:80] if result == "error" else None
+        except Exception as e:
+            result, error = "error", str(e)[:80]
+        results.append({"user": user_id, "question": question, "start": start,
+                        "latency": time.monotonic() - start, "outcome": result, "error": error})
+        time.sleep(rng.uniform(0, think_time))
+
+
+def run(args):
+    prompts = load_prompts(args.prompts)
+    if args.target == "pipeline":
+        shared = pipeline_target()
+        make_ask = lambda: shared
+    elif args.target == "http":
+        make_ask = lambda: http_target(args.url, args.timeout)
+    else:
+        make_ask = lambda: StreamlitSession(args.app_url, args.timeout).ask
+
+    sampler = ResourceSampler(args.pid or os.getpid(), args.sample_interval)
+    sampler.start()
+    results = []
+    stop_at = time.monotonic() + args.duration
+    started = time.monotonic()
+    threads = []
+    for user_id in range(args.users):
+        thread = threading.Thread(target=simulated_user, args=(
+            user_id, make_ask, prompts, args.turns, args.think_time, results, stop_at, args.seed))
+        threads.append(thread)
+        thread.start()
+        time.sleep(args.ramp_up / max(args.users, 1))
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    sampler.stopped.set()
+
+    latencies = [r["latency"] for r in results if r["outcome"] != "error"]
+    errors = [r for r in results if r["outcome"] == "error"]
+    rate = lambda name: round(sum(r["outcome"] == name for r in results) / len(results), 4) if results else 0.0
+    rss = [s["rss_mb"] for s in sampler.samples]
+    cpu = [s["cpu_percent"] for s in sampler.samples if s["cpu_percent"] is not None]
+    return {
+        "target": args.target,
+        "users": args.users,
+        "requests": len(results),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(results) / elapsed, 3) if elapsed else 0.0,
+        "error_rate": rate("error"),
+        "not_found_rate": rate("not_found"),
+        "shed_rate": rate("shed"),
+        "latency_s": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p90": round(percentile(latencies, 90), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies), 3) if latencies else 0.0,
+        },
+        "cpu_percent": {"mean": round(sum(cpu) / len(cpu), 1) if cpu else None, "max": round(max(cpu), 1) if cpu else None},
+        "rss_mb": {"start": round(rss[0], 1) if rss else None, "max": round(max(rss), 1) if rss else None},
+        "errors": sorted({e["error"] for e in errors if e["error"]})[:10],
+        "timeline": sampler.samples,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate concurrent MIT Nova users")
+    parser.add_argument("--target", choices=("pipeline", "http", "streamlit"), default="pipeline")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/ask", help="answer API for --target http")
+    parser.add_argument("--app-url", default="http://127.0.0.1:8501", help="Streamlit server for --target streamlit")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=5, help="questions per user")
+    parser.add_argument("--think-time", type=float, default=2.0, help="max seconds between questions")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="seconds to start all users")
+    parser.add_argument("--duration", type=float, default=300.0, help="hard stop, seconds")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--prompts", default="prompts.text", help="prompts.text-style list or a query log .jsonl")
+    parser.add_argument("--pid", type=int, help="process to sample CPU/RSS from (default: this one)")
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--real-llm", action="store_true", help="use the configured LLM instead of the mock")
+    parser.add_argument("--out", help="write the full JSON report here")
+    args = parser.parse_args()
+
+    if not args.real_llm:
+        os.environ.setdefault("NOVA_LLM_BACKEND", "mock")
+    report = run(args)
+    summary = {k: v for k, v in report.items() if k != "timeline"}
+    print(json.dumps(summary, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
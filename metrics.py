@@ -0,0 +1,25 @@
+import threading
+from collections import Counter
+
+# In-process counters, e.g. increment("route", tier="fast", reason="short lookup").
+# snapshot() returns plain dicts for logging or a status page.
+
+_lock = threading.Lock()
+_counters = Counter()
+
+
+def increment(name, amount=1, **labels):
+    key = (name,) + tuple(sorted(labels.items()))
+    with _lock:
+        _counters[key] += amount
+
+
+def snapshot():
+    with _lock:
+        items = list(_counters.items())
+    return [{"name": key[0], **dict(key[1:]), "value": value} for key, value in items]
+
+
+def reset():
+    with _lock:
+        _counters.clear()
@@ -0,0 +1,86 @@
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_backends import BackendError, MockBackend, RateLimited
+
+# OpenAI-compatible /v1/chat/completions served by MockBackend, for load tests and CI
+# benchmarks on machines with no network. Point the apps at it with
+#   NOVA_LLM_BACKEND=openai NOVA_LLM_BASE_URL=http://127.0.0.1:8001/v1
+
+
+def make_handler(backend):
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path in ("/health", "/v1/models"):
+                self.send_json(200, {"object": "list", "data": [{"id": "mock"}]})
+            else:
+                self.send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+                self.send_json(404, {"error": {"message": "not found"}})
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            try:
+                completion = backend.complete(
+                    request.get("model", "mock"),
+                    request["messages"],
+                    request.get("temperature", 0.3),
+                    request.get("max_tokens", 1000),
+                )
+            except RateLimited as e:
+                self.send_json(429, {"error": {"message": str(e), "type": "rate_limit_exceeded"}})
+                return
+            except BackendError as e:
+                self.send_json(500, {"error": {"message": str(e)}})
+                return
+            self.send_json(200, {
+                "id": f"mock-{time.time_ns()}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": completion.model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": completion.text},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": completion.prompt_tokens,
+                    "completion_tokens": completion.completion_tokens,
+                    "total_tokens": completion.prompt_tokens + completion.completion_tokens,
+                },
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deterministic OpenAI-compatible mock LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    backend = MockBackend(args.latency, args.tokens_per_second, args.answer_tokens,
+                          args.failure_rate, args.rate_limit_rate, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(backend))
+    print(f"Mock LLM listening on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
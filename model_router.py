@@ -0,0 +1,69 @@
+import os
+import re
+
+import metrics
+
+# Picks the cheapest tier that can answer a question well. Plain lookups with a strong
+# FAQ match are answered verbatim, short factual questions go to the small model, and
+# multi-part or "explain in detail" questions, weak retrieval or large contexts go to
+# the large one. Each tier carries its own cost and latency limits.
+
+TIERS = {
+    "faq": {
+        "model": None,
+    },
+    "fast": {
+        "model": os.environ.get("NOVA_FAST_MODEL", "llama3-8b-8192"),
+        "max_tokens": int(os.environ.get("NOVA_FAST_MAX_TOKENS", "1000")),
+        "timeout": float(os.environ.get("NOVA_FAST_TIMEOUT", "15")),
+    },
+    "large": {
+        "model": os.environ.get("NOVA_LARGE_MODEL", "llama3-70b-8192"),
+        "max_tokens": int(os.environ.get("NOVA_LARGE_MAX_TOKENS", "1000")),
+        "timeout": float(os.environ.get("NOVA_LARGE_TIMEOUT", "30")),
+    },
+}
+
+# A question this close to an FAQ question is answered with the FAQ answer directly
+FAQ_ANSWER_THRESHOLD = float(os.environ.get("NOVA_FAQ_ANSWER_THRESHOLD", "0.85"))
+# Below this best retrieval relevance the small model tends to guess
+LOW_CONFIDENCE = 0.4
+# Roughly 4 characters per token for English text
+LARGE_CONTEXT_TOKENS = 1500
+LONG_QUESTION_WORDS = 20
+
+# Asks for an explanation rather than a fact. "How do I ..." and "what is the process
+# for ..." are how most plain lookups are phrased, so they don't count
+DETAIL_PATTERN = re.compile(
+    r"\b(explain|in detail|describe|elaborate|compare|difference|differences|why|"
+    r"how does \w+(?: \w+){0,4} work|all the|list all|summari[sz]e)\b",
+    re.IGNORECASE,
+)
+
+
+def estimate_tokens(text):
+    return len(text) // 4
+
+
+def is_multi_part(user_query):
+    return user_query.count("?") > 1 or bool(re.search(r"\b(and also|as well as)\b", user_query, re.IGNORECASE))
+
+
+def route(user_query, top_score, context, faq_score=0.0):
+    # Returns (tier name, reason)
+    if faq_score >= FAQ_ANSWER_THRESHOLD and not DETAIL_PATTERN.search(user_query):
+        tier, reason = "faq", "faq match"
+    elif DETAIL_PATTERN.search(user_query):
+        tier, reason = "large", "explanatory question"
+    elif is_multi_part(user_query):
+        tier, reason = "large", "multi-part question"
+    elif len(user_query.split()) > LONG_QUESTION_WORDS:
+        tier, reason = "large", "long question"
+    elif top_score < LOW_CONFIDENCE:
+        tier, reason = "large", "low retrieval confidence"
+    elif estimate_tokens(context) > LARGE_CONTEXT_TOKENS:
+        tier, reason = "large", "large context"
+    else:
+        tier, reason = "fast", "short lookup"
+    metrics.increment("route", tier=tier, reason=reason)
+    return tier, reason
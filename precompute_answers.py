@@ -0,0 +1,168 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import rag_engine
+from admission import AdmissionController
+from answer_cache import AnswerCache
+from index_manager import IndexManager
+from index_snapshot import snapshot_version
+from load_test import load_prompts
+from query_log import QUERY_LOG_PATH, QueryLog
+from replay_log import frequent_questions, load_records
+
+# Batch job that re-answers the most frequent questions against the current index and
+# writes them to the shared answer cache (NOVA_ANSWER_CACHE), keyed by index version, so
+# the first asker after a quiet night or a re-index gets a cached answer.
+#
+#   python precompute_answers.py                                   # once, e.g. from cron
+#   python precompute_answers.py --daily-at 05:00 --no-initial-run  # beside the app
+#
+# Questions come from the query log (last --days), topped up from prompts.text. Point
+# the apps at the same file with NOVA_ANSWER_CACHE; they pick up rewrites within a minute.
+# The served version is resolved like the apps do (NOVA_SNAPSHOT_DIR, else "local");
+# --follow-current tracks <NOVA_SNAPSHOT_ROOT>/CURRENT as MIT_Nova_streamlit.py does.
+
+SNAPSHOT_DIR = os.environ.get("NOVA_SNAPSHOT_DIR")
+SNAPSHOT_ROOT = os.environ.get("NOVA_SNAPSHOT_ROOT", "./snapshots")
+UNIFIED_DB = os.environ.get("NOVA_UNIFIED_DB")
+# Batch questions may wait for LLM slots instead of being shed after the interactive deadline
+BATCH_DEADLINE = 600.0
+# Precompute's own slice of the provider quota. Lower the app's NOVA_LLM_RPM by as much
+# when both run on one key, so together they stay within it
+PRECOMPUTE_RPM = float(os.environ.get("NOVA_PRECOMPUTE_RPM", "5"))
+PRECOMPUTE_CONCURRENCY = 1
+
+
+def mine_questions(log_path, days, top, min_count, prompts_path=None):
+    questions = [q for q, count in frequent_questions(load_records(log_path, days * 24)) if count >= min_count]
+    seen = {rag_engine.normalize_query(q) for q in questions}
+    if prompts_path and os.path.exists(prompts_path):
+        for q in load_prompts(prompts_path):
+            if rag_engine.normalize_query(q) not in seen:
+                seen.add(rag_engine.normalize_query(q))
+                questions.append(q)
+    return questions[:top]
+
+
+def served_snapshot(follow_current=False):
+    # (index version, snapshot dir or None) the apps serve; cheap, opens nothing
+    snapshot_dir = SNAPSHOT_DIR
+    if follow_current:
+        published = IndexManager(SNAPSHOT_ROOT, None).current_version()
+        if published:
+            snapshot_dir = os.path.join(SNAPSHOT_ROOT, published)
+    return snapshot_version(snapshot_dir), snapshot_dir
+
+
+def open_current(embeddings, follow_current=False):
+    # The served version with its stores and FAQ index, opened the way the apps open them
+    from faq_index import FaqIndex
+
+    version, snapshot_dir = served_snapshot(follow_current)
+    if snapshot_dir:
+        from index_snapshot import open_version
+
+        stores, faq_index = open_version(snapshot_dir, embeddings)
+        if faq_index is None:
+            faq_index = FaqIndex.load_or_build("./company_policies.json", "./faq_index.npz", embeddings)
+        return version, stores, faq_index
+    faq_index = FaqIndex.load_or_build("./company_policies.json", "./faq_index.npz", embeddings)
+    if UNIFIED_DB:
+        from ingest import open_unified_store
+
+        db = open_unified_store(UNIFIED_DB, embeddings)
+        return "local", (db, db), faq_index
+    from langchain_community.vectorstores import Chroma
+
+    return "local", (
+        Chroma(persist_directory="./json_db", embedding_function=embeddings),
+        Chroma(persist_directory="./pdf_db", embedding_function=embeddings),
+    ), faq_index
+
+
+def precompute(questions, workers, cache_path, follow_current=False, app=None):
+    from embedding_service import shared_embeddings
+    from llm_backends import get_backend
+
+    rag_engine.answer_cache = cache = AnswerCache(cache_path)
+    # Precomputed questions must not count as traffic in the next mining pass
+    rag_engine.query_log = QueryLog(None)
+    rag_engine.admission = AdmissionController(PRECOMPUTE_RPM, PRECOMPUTE_CONCURRENCY)
+    embeddings = shared_embeddings("all-MiniLM-L6-v2")
+    version, (json_db, pdf_db), faq_index = open_current(embeddings, follow_current)
+    # The app's own Groq key, so the two share (and split) one quota
+    client = get_backend(app=app)
+
+    def answer(question):
+        rag_engine.rag_query(json_db, pdf_db, question, client=client, faq_index=faq_index,
+                             index_version=version, refresh=True,
+                             deadline=time.monotonic() + BATCH_DEADLINE)
+        # rag_query only caches real answers; fallbacks and errors are left for next time
+        return cache.get(rag_engine.normalize_query(question), version) is not None
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        cached = sum(pool.map(answer, questions))
+    cache.save()
+    print(f"Cached {cached}/{len(questions)} answers for index {version} "
+          f"in {time.monotonic() - started:.1f}s -> {cache_path}")
+    return version
+
+
+def seconds_until(daily_at):
+    hour, minute = (int(part) for part in daily_at.split(":"))
+    now = time.localtime()
+    target = time.mktime(now[:3] + (hour, minute, 0) + now[6:])
+    if target <= time.time():
+        target += 24 * 3600
+    return target - time.time()
+
+
+def run(args):
+    questions = mine_questions(args.log, args.days, args.top, args.min_count, args.prompts)
+    return precompute(questions, args.workers, args.cache, args.follow_current, args.app)
+
+
+def run_pass(args):
+    # Scheduled passes run in a child process, so the model and stores they load are
+    # freed when they finish instead of sitting beside the app until the next pass
+    child = multiprocessing.Process(target=run, args=(args,), name="precompute")
+    child.start()
+    child.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute answers for the most frequent questions")
+    parser.add_argument("--log", default=QUERY_LOG_PATH)
+    parser.add_argument("--days", type=float, default=7.0, help="query log window")
+    parser.add_argument("--top", type=int, default=200)
+    parser.add_argument("--min-count", type=int, default=2, help="times a logged question must have been asked")
+    parser.add_argument("--prompts", default="prompts.text", help="seed questions; '' to skip")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--app", help="Streamlit script whose Groq key to use, e.g. MIT_Nova_1.py")
+    parser.add_argument("--cache", default=os.environ.get("NOVA_ANSWER_CACHE", "./answer_cache.json"))
+    parser.add_argument("--daily-at", metavar="HH:MM", help="keep running; precompute daily and after re-indexes")
+    parser.add_argument("--no-initial-run", action="store_true",
+                        help="with --daily-at, wait for the first scheduled time instead of starting now")
+    parser.add_argument("--follow-current", action="store_true",
+                        help="answer against <NOVA_SNAPSHOT_ROOT>/CURRENT, for apps that hot-swap it")
+    parser.add_argument("--poll-interval", type=float, default=60.0)
+    args = parser.parse_args()
+
+    if not args.daily_at:
+        run(args)
+    else:
+        version = served_snapshot(args.follow_current)[0]
+        if not args.no_initial_run:
+            run_pass(args)
+        next_run = time.monotonic() + seconds_until(args.daily_at)
+        while True:
+            time.sleep(args.poll_interval)
+            served = served_snapshot(args.follow_current)[0]
+            if time.monotonic() >= next_run or served != version:
+                version = served
+                run_pass(args)
+                next_run = time.monotonic() + seconds_until(args.daily_at)
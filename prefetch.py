@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Speculative retrieval while a question is being typed. Each session's latest text is
+# debounced; once it has been stable for PREFETCH_DEBOUNCE seconds its retrieval runs in
+# the background and the result is kept briefly under the retrieval key. When the
+# question is submitted, rag_query takes the result (waiting if it is still running),
+# leaving only generation on the critical path.
+
+PREFETCH_DEBOUNCE = float(os.environ.get("NOVA_PREFETCH_DEBOUNCE_MS", "300")) / 1000.0
+PREFETCH_TTL = 60.0
+PREFETCH_MAX_ENTRIES = 500
+PREFETCH_WORKERS = 2
+# Shorter partial questions are too vague to be worth a search
+PREFETCH_MIN_CHARS = 8
+
+
+class RetrievalPrefetcher:
+    def __init__(self, debounce=PREFETCH_DEBOUNCE, ttl=PREFETCH_TTL, max_entries=PREFETCH_MAX_ENTRIES,
+                 workers=PREFETCH_WORKERS):
+        self.debounce = debounce
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.timers = {}
+        self.results = OrderedDict()
+        # Threads start on first use, so a pre-fork master never owns any
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+
+    def schedule(self, session_id, key, fn):
+        # A newer keystroke from the same session replaces the pending one
+        timer = threading.Timer(self.debounce, self._start, (session_id, key, fn))
+        timer.daemon = True
+        with self.lock:
+            previous = self.timers.get(session_id)
+            self.timers[session_id] = timer
+        if previous is not None:
+            previous.cancel()
+        timer.start()
+
+    def _start(self, session_id, key, fn):
+        with self.lock:
+            if self.timers.get(session_id) is threading.current_thread():
+                del self.timers[session_id]
+            entry = self.results.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                return
+            self.results[key] = (time.monotonic(), self.pool.submit(fn))
+            while len(self.results) > self.max_entries:
+                self.results.popitem(last=False)
+
+    def take(self, key, timeout=None):
+        # The retrieval result for key, or None if nothing usable was prefetched
+        with self.lock:
+            entry = self.results.get(key)
+        if entry is None or time.monotonic() - entry[0] >= self.ttl:
+            return None
+        try:
+            return entry[1].result(timeout)
+        except Exception:
+            return None
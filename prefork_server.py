@@ -0,0 +1,252 @@
+import argparse
+import gc
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Pre-fork answer API. The master loads the embedding model, the FAQ index and (when
+# NOVA_SNAPSHOT_DIR is set) the mmapped snapshot stores once, then forks N workers that
+# share those pages copy-on-write. The workers accept from one inherited listening
+# socket, so the kernel balances connections between them; put Render's or nginx's
+# proxy in front as usual. Dead workers are replaced.
+#
+# Prefetched retrievals live in the worker that ran them, so requests carrying a
+# "session" are pinned to one worker by its hash: a worker that accepts another slot's
+# session forwards the request to that worker's loopback port. Send the same session
+# with /prefetch and /ask; requests without one are answered where they land.
+#
+#   POST /ask     {"question": ..., "filters": {...}, "session": ...}  ->  {"answer": ..., "worker": pid}
+#   POST /prefetch {"question": <partial text>, "session": ...}  ->  202, while typing
+#   GET  /health  {"status": "ok", "worker": pid}
+#   GET  /ready   200 with warm-up timings once warm, else 503
+#
+#   python faq_index.py      # once per FAQ change; the master never encodes
+#   python prefork_server.py --workers 4 --port 8000
+
+# Hugging Face tokenizers start a Rust thread pool that is not fork-safe
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+import rag_engine  # noqa: E402
+from admission import LLM_MAX_CONCURRENT, LLM_REQUESTS_PER_MINUTE, AdmissionController  # noqa: E402
+from embedding_service import configure_torch_threads, shared_embeddings  # noqa: E402
+from faq_index import FaqIndex  # noqa: E402
+from index_snapshot import open_version, snapshot_version  # noqa: E402
+from llm_backends import get_backend  # noqa: E402
+from warmup import readiness, warm_up  # noqa: E402
+
+SNAPSHOT_DIR = os.environ.get("NOVA_SNAPSHOT_DIR")
+UNIFIED_DB = os.environ.get("NOVA_UNIFIED_DB")
+# A forwarded request waits as long as its client would for the answer
+FORWARD_TIMEOUT = 120.0
+
+
+def load_shared():
+    # Everything here is read-only after fork
+    embeddings = shared_embeddings("all-MiniLM-L6-v2")
+    stores, faq_index = open_version(SNAPSHOT_DIR, embeddings) if SNAPSHOT_DIR else (None, None)
+    if faq_index is None:
+        # Only load here: building encodes, and inference must wait until after fork
+        faq_index = FaqIndex.load_current("./company_policies.json", "./faq_index.npz", embeddings)
+    if faq_index is None:
+        sys.exit("./faq_index.npz is missing or older than ./company_policies.json; "
+                 "build it first with `python faq_index.py`")
+    return embeddings, faq_index, stores
+
+
+def open_worker_stores(embeddings, stores):
+    if stores is not None:
+        return stores, snapshot_version(SNAPSHOT_DIR)
+    # Chroma's sqlite connections can't cross a fork, so each worker opens its own
+    from langchain_community.vectorstores import Chroma
+
+    if UNIFIED_DB:
+        from ingest import open_unified_store
+
+        db = open_unified_store(UNIFIED_DB, embeddings)
+        return (db, db), "local"
+    return (
+        Chroma(persist_directory="./json_db", embedding_function=embeddings),
+        Chroma(persist_directory="./pdf_db", embedding_function=embeddings),
+    ), "local"
+
+
+def session_slot(session, workers):
+    # Stable across processes, unlike hash()
+    return zlib.crc32(session.encode("utf-8")) % workers
+
+
+def forward(port, path, request, timeout=FORWARD_TIMEOUT):
+    # (status, payload) from the worker listening on the loopback port
+    http_request = urllib.request.Request(f"http://127.0.0.1:{port}{path}",
+                                          data=json.dumps(request).encode("utf-8"),
+                                          headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(http_request, timeout=timeout) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def make_handler(ask, prefetch=None, route=None):
+    # route(session) -> loopback port of the worker owning the session, or None for this one
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self.send_json(200, {"status": "ok", "worker": os.getpid()})
+            elif self.path == "/ready":
+                status = 200 if readiness.is_ready() else 503
+                self.send_json(status, {"ready": readiness.is_ready(), "warmup_ms": readiness.report,
+                                        "worker": os.getpid()})
+            else:
+                self.send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            path = self.path.rstrip("/")
+            if path not in ("/ask", "/prefetch") or (path == "/prefetch" and prefetch is None):
+                self.send_json(404, {"error": "not found"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                question = request["question"].strip()
+            except (ValueError, KeyError, AttributeError):
+                self.send_json(400, {"error": "expected {\"question\": ...}"})
+                return
+            port = route(str(request["session"])) if route and request.get("session") else None
+            if port is not None:
+                try:
+                    self.send_json(*forward(port, path, request))
+                    return
+                except (OSError, ValueError):
+                    # Owner restarting or stuck: answer here, without its prefetch
+                    pass
+            if path == "/prefetch":
+                # Debounced per session; the connection itself is a fallback session ID
+                session = str(request.get("session") or self.client_address[0])
+                self.send_json(202, {"scheduled": prefetch(question, session, request.get("filters"))})
+                return
+            self.send_json(200, {"answer": ask(question, request.get("filters")), "worker": os.getpid()})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(sock, handler):
+    server = ThreadingHTTPServer(sock.getsockname(), handler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def serve_worker(listener, loopbacks, slot, shared):
+    embeddings, faq_index, stores = shared
+    workers = len(loopbacks)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    # Split the cores and the LLM quota between workers instead of each assuming all of it
+    configure_torch_threads(max(1, (os.cpu_count() or 1) // workers))
+    rag_engine.admission = AdmissionController(
+        LLM_REQUESTS_PER_MINUTE / workers, max(1, LLM_MAX_CONCURRENT // workers))
+    (json_db, pdf_db), version = open_worker_stores(embeddings, stores)
+    client = get_backend()
+    # Warm before accepting, so no connection lands on a cold worker; inference runs
+    # after fork because torch's thread pools don't survive one
+    warm_up(embeddings, (json_db, pdf_db), faq_index, client)
+
+    def ask(question, filters=None):
+        return rag_engine.rag_query_shared(json_db, pdf_db, question, index_version=version,
+                                           client=client, faq_index=faq_index, filters=filters)
+
+    def prefetch(partial_question, session, filters=None):
+        return rag_engine.prefetch(json_db, pdf_db, partial_question, session, index_version=version,
+                                   filters=filters, faq_index=faq_index)
+
+    def route(session):
+        owner = session_slot(session, workers)
+        return None if owner == slot else loopbacks[owner].getsockname()[1]
+
+    # Forwarded requests arrive on this slot's loopback socket and are always served here
+    threading.Thread(target=serve, args=(loopbacks[slot], make_handler(ask, prefetch)),
+                     name="loopback", daemon=True).start()
+    serve(listener, make_handler(ask, prefetch, route))
+
+
+def spawn(listener, loopbacks, slot, shared):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            serve_worker(listener, loopbacks, slot, shared)
+        finally:
+            os._exit(1)
+    return pid
+
+
+def listen(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(128)
+    return sock
+
+
+def run(host, port, workers):
+    shared = load_shared()
+    listener = listen(host, port)
+    # One loopback socket per worker slot, opened before forking so every worker knows
+    # where each session's owner listens; a replacement worker takes over its slot's
+    # socket, and requests forwarded meanwhile wait in its backlog
+    loopbacks = [listen("127.0.0.1", 0) for _ in range(workers)]
+
+    # Move everything loaded so far out of the collector's reach, so GC passes in the
+    # workers don't write to (and un-share) those pages
+    gc.collect()
+    gc.freeze()
+
+    children = {spawn(listener, loopbacks, slot, shared): slot for slot in range(workers)}
+    print(f"MIT Nova API on http://{host}:{port} with {workers} workers")
+
+    def shutdown(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    while True:
+        pid, status = os.wait()
+        slot = children.pop(pid, None)
+        if slot is None:
+            continue
+        print(f"Worker {pid} exited with status {status}; restarting")
+        time.sleep(1)
+        children[spawn(listener, loopbacks, slot, shared)] = slot
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve MIT Nova answers from pre-forked workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    run(args.host, args.port, args.workers)
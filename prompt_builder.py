@@ -0,0 +1,72 @@
+import hashlib
+import os
+
+# Canonical prompts: a fixed system preamble, context chunks in stable chunk-ID order
+# and the question last. The same or related questions then share a long identical
+# prefix, which providers with prompt/KV-prefix caching bill and serve faster.
+# Templates are versioned so a wording change is an explicit, new prefix.
+
+# What the model replies, alone, when the context doesn't answer the question;
+# rag_engine turns it into the not-found reply and a negative-cache entry
+NOT_IN_CONTEXT = "NOT_IN_CONTEXT"
+
+PROMPT_TEMPLATES = {
+    "v1": {
+        "system": "Answer professionally based on the context.",
+        "user": "Context:\n{context}\n\n{style}Question: {question}",
+    },
+    "v2": {
+        "system": (
+            "You are MIT Nova, the internal HR and policy assistant for Mastech Infotrellis. "
+            "Answer professionally, using only the context provided. If the context does not "
+            "contain the answer, say so."
+        ),
+        "user": "Context:\n{context}\n\n{style}Question: {question}",
+    },
+    "v3": {
+        "system": (
+            "You are MIT Nova, the internal HR and policy assistant for Mastech Infotrellis. "
+            "Answer professionally, using only the context provided. If the context does not "
+            f"contain the answer, reply with exactly {NOT_IN_CONTEXT} and nothing else."
+        ),
+        "user": "Context:\n{context}\n\n{style}Question: {question}",
+    },
+}
+
+PROMPT_VERSION = os.environ.get("NOVA_PROMPT_VERSION", "v3")
+
+
+def chunk_id(doc):
+    # Ingest assigns chunk_id; older stores fall back to source/page plus a content hash
+    metadata = doc.metadata or {}
+    if metadata.get("chunk_id"):
+        return str(metadata["chunk_id"])
+    digest = hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()[:12]
+    location = metadata.get("page", metadata.get("seq_num", ""))
+    return f"{os.path.basename(str(metadata.get('source', '')))}:{location}:{digest}"
+
+
+def faq_chunk_id(entry):
+    return "faq:" + hashlib.sha1(entry["question"].encode("utf-8")).hexdigest()[:12]
+
+
+def canonical_context(chunks):
+    # chunks: (chunk_id, text) pairs; duplicates dropped, order fixed by ID
+    unique = {}
+    for cid, text in chunks:
+        unique.setdefault(cid, text)
+    return "\n".join(unique[cid] for cid in sorted(unique))
+
+
+def build_messages(chunks, question, version=None, style=None):
+    # The per-question style instruction sits after the context, keeping the prefix shared
+    template = PROMPT_TEMPLATES[version or PROMPT_VERSION]
+    user = template["user"].format(
+        context=canonical_context(chunks),
+        style=f"{style}\n" if style else "",
+        question=question,
+    )
+    return [
+        {"role": "system", "content": template["system"]},
+        {"role": "user", "content": user},
+    ]
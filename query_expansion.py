@@ -0,0 +1,88 @@
+import os
+import re
+
+# Query variants for retrieval recall: domain abbreviations spelled out (and the reverse),
+# bare topics phrased as questions, and optionally LLM paraphrases. rag_engine embeds the
+# variants together, searches them in parallel and merges the rankings with
+# reciprocal rank fusion.
+
+QUERY_EXPANSION = os.environ.get("NOVA_QUERY_EXPANSION", "0") == "1"
+# LLM paraphrases per question; 0 keeps expansion free of LLM calls
+EXPANSION_PARAPHRASES = int(os.environ.get("NOVA_EXPANSION_PARAPHRASES", "0"))
+MAX_VARIANTS = 4
+# Standard RRF constant; damps the weight of top ranks from any single list
+RRF_K = 60
+
+# Abbreviations as the policies and handbook use them
+GLOSSARY = {
+    "PTO": "paid time off",
+    "ODC": "Offshore Development Centre",
+    "GTM": "go-to-market",
+    "L&D": "Learning & Development",
+    "WFH": "work from home",
+    "POC": "Point of Contact",
+}
+
+QUESTION_WORDS = re.compile(r"^(what|who|when|where|which|why|how|is|are|can|do|does|should|will)\b", re.IGNORECASE)
+
+PARAPHRASE_PROMPT = (
+    "Rewrite the following HR policy question {n} different ways, keeping its meaning. "
+    "Reply with one rewrite per line and nothing else.\n\nQuestion: {question}"
+)
+
+
+def glossary_pattern(term):
+    # \b doesn't work next to "&", so match on non-word neighbours instead
+    return re.compile(rf"(?<![\w&]){re.escape(term)}(?![\w&])", re.IGNORECASE)
+
+
+def expand_abbreviations(question):
+    expanded = question
+    for short, long in GLOSSARY.items():
+        expanded = glossary_pattern(short).sub(long, expanded)
+    return expanded
+
+
+def contract_phrases(question):
+    contracted = question
+    for short, long in GLOSSARY.items():
+        contracted = glossary_pattern(long).sub(short, contracted)
+    return contracted
+
+
+def expand_query(question, max_variants=MAX_VARIANTS):
+    # The original question always comes first
+    question = question.strip()
+    variants = [question, expand_abbreviations(question), contract_phrases(question)]
+    words = question.rstrip("?.").split()
+    if len(words) <= 3 and not QUESTION_WORDS.search(question):
+        # Bare topics like "web clock" embed closer to the FAQ questions when asked as one;
+        # longer statements are left to the LLM paraphrases
+        variants.append(f"What is {' '.join(words)}?")
+    unique = []
+    for variant in variants:
+        if variant and variant.lower() not in (u.lower() for u in unique):
+            unique.append(variant)
+    return unique[:max_variants]
+
+
+def paraphrase_messages(question, n=EXPANSION_PARAPHRASES):
+    return [{"role": "user", "content": PARAPHRASE_PROMPT.format(n=n, question=question)}]
+
+
+def parse_paraphrases(text, n=EXPANSION_PARAPHRASES):
+    lines = [re.sub(r"^\s*(\d+[.)]|[-*])\s*", "", line).strip() for line in text.splitlines()]
+    return [line for line in lines if line][:n]
+
+
+def reciprocal_rank_fusion(rankings, key):
+    # rankings: lists of (item, score), best first. Returns (item, best score) ordered by
+    # summed 1 / (RRF_K + rank); the best raw score is kept for thresholds downstream.
+    fused, best = {}, {}
+    for ranking in rankings:
+        for rank, (item, score) in enumerate(ranking, 1):
+            item_key = key(item)
+            fused[item_key] = fused.get(item_key, 0.0) + 1.0 / (RRF_K + rank)
+            if item_key not in best or score > best[item_key][1]:
+                best[item_key] = (item, score)
+    return [best[item_key] for item_key in sorted(fused, key=fused.get, reverse=True)]
@@ -0,0 +1,139 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: no pre-forked workers share the file
+    fcntl = None
+
+# Structured per-question log, one JSON object per line: the question, its normalized
+# form, retrieved chunk IDs and scores, model, token counts and per-stage timings.
+# log() only appends to an in-memory buffer; a background thread writes batches and
+# rotates the file by size (requests.jsonl -> requests.jsonl.1 ... .N).
+
+QUERY_LOG_PATH = os.environ.get("NOVA_QUERY_LOG", "logs/requests.jsonl")
+QUERY_LOG_MAX_BYTES = int(float(os.environ.get("NOVA_QUERY_LOG_MAX_MB", "50")) * 2**20)
+QUERY_LOG_BACKUPS = int(os.environ.get("NOVA_QUERY_LOG_BACKUPS", "5"))
+FLUSH_INTERVAL = 1.0
+# Records kept while the disk is slow; beyond this the oldest are dropped, not waited on
+MAX_BUFFERED = 10000
+
+
+class StageTimer:
+    def __init__(self):
+        self.timings = {}
+        self.last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.timings[stage] = round((now - self.last) * 1000, 2)
+        self.last = now
+
+
+class QueryLog:
+    def __init__(self, path=QUERY_LOG_PATH, max_bytes=QUERY_LOG_MAX_BYTES, backups=QUERY_LOG_BACKUPS,
+                 flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def _start(self):
+        # Lazily, and again in a forked worker, whose copy of the writer thread is gone
+        self.pid = os.getpid()
+        self.buffer = deque(maxlen=MAX_BUFFERED)
+        self.thread = threading.Thread(target=self._run, name="query-log", daemon=True)
+        self.thread.start()
+        atexit.register(self.flush)
+
+    def log(self, record):
+        if not self.path:
+            return
+        if self.pid != os.getpid():
+            with self.lock:
+                if self.pid != os.getpid():
+                    self._start()
+        if len(self.buffer) == self.buffer.maxlen:
+            metrics.increment("query_log_dropped")
+        self.buffer.append(record)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                metrics.increment("query_log_errors")
+
+    def flush(self):
+        lines = []
+        while self.buffer:
+            lines.append(json.dumps(self.buffer.popleft(), ensure_ascii=False) + "\n")
+        if not lines:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One O_APPEND write per batch, so pre-forked workers sharing the file don't interleave
+        # lines. The lock covers the size check and rotation too: two workers rotating at
+        # once would move the fresh file over the backup the other just made
+        with self._file_lock():
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, "".join(lines).encode("utf-8"))
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+            if size >= self.max_bytes:
+                self.rotate()
+
+    @contextmanager
+    def _file_lock(self):
+        # Across processes, on a file next to the log that rotation never moves
+        with open(f"{self.path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def rotate(self):
+        for n in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{n}"):
+                os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+def log_files(path=QUERY_LOG_PATH):
+    # Oldest first, so replays keep the original order
+    files = [path] if os.path.exists(path) else []
+    n = 1
+    while os.path.exists(f"{path}.{n}"):
+        files.insert(0, f"{path}.{n}")
+        n += 1
+    return files
+
+
+def read_records(paths):
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash mid-write
+                    continue
@@ -0,0 +1,429 @@
+import math
+import os
+import re
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from admission import AdmissionController, Overloaded
+from answer_length import answer_budget
+from answer_cache import AnswerCache
+from faq_index import entry_text
+from llm_backends import RateLimited, get_backend
+from model_router import TIERS, route
+from prompt_builder import NOT_IN_CONTEXT, build_messages, canonical_context, chunk_id, faq_chunk_id
+from prefetch import PREFETCH_MIN_CHARS, RetrievalPrefetcher
+from query_expansion import (EXPANSION_PARAPHRASES, QUERY_EXPANSION, expand_query, paraphrase_messages,
+                             parse_paraphrases, reciprocal_rank_fusion)
+from query_log import QueryLog, StageTimer
+from single_flight import SingleFlight
+
+NOT_FOUND_ANSWER = "Sorry, I couldn't find relevant information. Please rephrase your question."
+CANCELLED_ANSWER = "Request cancelled."
+OVERLOADED_ANSWER = "MIT Nova is handling a lot of questions right now. Please try again in a minute."
+
+# Office locations a question can be scoped to; chunks tagged "All" apply everywhere
+KNOWN_REGIONS = ("Chennai", "Bangalore", "Hyderabad", "Pittsburgh", "Toronto")
+
+# Cosine floor for question-to-question FAQ matches
+FAQ_THRESHOLD = 0.45
+# FAQ matches this close are answered verbatim when the LLM is unavailable
+FAQ_DIRECT_THRESHOLD = 0.75
+
+# Below this top document relevance nothing in the index answers the question. Off (0)
+# until set from a calibration run: `python replay_log.py --calibrate` suggests a value
+# from the query log, since misses it records are negative-cached
+NOT_FOUND_FLOOR = float(os.environ.get("NOVA_NOT_FOUND_FLOOR", "0"))
+# Below this, hits that share no content word with the question are treated as misses
+LEXICAL_GUARD = 0.5
+# Negative outcomes are kept for less time than answers; documents get added
+NEGATIVE_TTL = float(os.environ.get("NOVA_NEGATIVE_TTL", str(6 * 3600)))
+
+# The model's whole reply is the prompt's not-in-context sentinel; answers that merely
+# mention missing details are real answers and get cached as such
+REFUSAL_PATTERN = re.compile(rf"\s*{re.escape(NOT_IN_CONTEXT)}\.?\s*")
+STOPWORDS = {
+    "the", "and", "for", "are", "what", "when", "where", "which", "who", "whom", "how", "why",
+    "can", "could", "should", "would", "will", "does", "did", "has", "have", "any", "about",
+    "with", "from", "this", "that", "there", "their", "our", "your", "you", "get", "give",
+    "tell", "explain", "detail", "company", "employee", "employees", "mastech", "infotrellis",
+}
+
+
+# Identical questions asked at the same time share one pipeline run
+inflight = SingleFlight()
+
+# Process-wide answer cache and LLM admission control
+answer_cache = AnswerCache(os.environ.get("NOVA_ANSWER_CACHE"))
+negative_cache = AnswerCache(os.environ.get("NOVA_NEGATIVE_CACHE"), ttl=NEGATIVE_TTL)
+
+# Retrieval started while the user is still typing (see prefetch below)
+prefetcher = RetrievalPrefetcher()
+
+# Metadata keys each store's chunks carry, sampled once per store
+store_tags = weakref.WeakKeyDictionary()
+
+# Query-variant embeddings and searches run side by side here
+expansion_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="expansion")
+# Paraphrases are skipped rather than waited on past this
+PARAPHRASE_TIMEOUT = 2.0
+admission = AdmissionController()
+
+# Structured record of every question, written off the request path
+query_log = QueryLog()
+
+
+def normalize_query(user_query):
+    # Case, punctuation and spacing differences shouldn't split identical questions
+    text = re.sub(r"['\u2019]", "", user_query.lower())
+    return " ".join(re.sub(r"[^\w\s&]", " ", text).split())
+
+
+def infer_filters(user_query):
+    # Pick up an office location mentioned in the question
+    filters = {}
+    for region in KNOWN_REGIONS:
+        if re.search(rf"\b{region}\b", user_query, re.IGNORECASE):
+            filters["region"] = region
+            break
+    return filters
+
+
+def build_where(filters):
+    # Translate {"region": "Chennai", ...} into a Chroma where clause
+    if not filters:
+        return None
+    clauses = []
+    for key, value in filters.items():
+        if value in (None, ""):
+            continue
+        if isinstance(value, (list, tuple, set)):
+            values = [str(v) for v in value]
+        else:
+            values = [str(value)]
+        # Region-scoped questions still need the company-wide chunks
+        if key == "region" and "All" not in values:
+            values.append("All")
+        if len(values) == 1:
+            clauses.append({key: values[0]})
+        else:
+            clauses.append({key: {"$in": values}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def content_words(text):
+    return {word.rstrip("s") for word in re.findall(r"[a-z0-9&]+", text.lower())
+            if len(word) > 2 and word not in STOPWORDS}
+
+
+def shares_terms(user_query, chunks):
+    # True if any content word of the question appears in the retrieved text
+    words = content_words(user_query)
+    return not words or bool(words & content_words(" ".join(text for cid, text in chunks)))
+
+
+def not_found(normalized, index_version, scope, record, reason):
+    negative_cache.put(normalized, index_version, NOT_FOUND_ANSWER, scope)
+    metrics.increment("not_found", reason=reason)
+    record["outcome"] = "not_found"
+    record["not_found_reason"] = reason
+    return NOT_FOUND_ANSWER
+
+
+def degraded_answer(faq_hits):
+    # Used when the LLM can't be reached in time: the closest FAQ answer, if it's close enough
+    if faq_hits and faq_hits[0][1] >= FAQ_DIRECT_THRESHOLD:
+        return faq_hits[0][0]["answer"]
+    return OVERLOADED_ANSWER
+
+
+def cosine_relevance(cosine):
+    # Chroma's default relevance for unit vectors, whose squared L2 distance is 2 - 2cos
+    return 1.0 - (2.0 - 2.0 * cosine) / math.sqrt(2)
+
+
+def search_by_vector(db, vector, k, threshold, where=None):
+    hits = db.similarity_search_by_vector_with_relevance_scores(vector, k=k, filter=where)
+    # The by-vector search returns squared L2 distances; convert with Chroma's default
+    # relevance function so thresholds match the text search
+    hits = [(doc, 1.0 - distance / math.sqrt(2)) for doc, distance in hits]
+    return [(doc, score) for doc, score in hits if score >= threshold]
+
+
+def tagged(db, filters):
+    # Whether the store's chunks carry the filter keys at all. Stores built before ingest
+    # tagging (the shipped json_db and pdf_db) don't, and a filtered search of them only
+    # finds nothing and has to be repeated unfiltered
+    if db is None or not filters:
+        return False
+    if db not in store_tags:
+        if hasattr(db, "record"):
+            # SnapshotIndex
+            sample = [db.record(0)["metadata"]] if len(db) else []
+        else:
+            sample = db.get(limit=1, include=["metadatas"])["metadatas"]
+        store_tags[db] = set(sample[0] or {}) if sample else set()
+    return set(filters) <= store_tags[db]
+
+
+def search(db, user_query, k, threshold, where=None, vectors=None):
+    # (doc, score) pairs above the relevance threshold. With query-variant vectors, one
+    # search per variant in parallel, merged by reciprocal rank fusion
+    if db is None:
+        return []
+    if vectors:
+        rankings = expansion_pool.map(lambda vector: search_by_vector(db, vector, k, threshold, where), vectors)
+        return reciprocal_rank_fusion(list(rankings), key=chunk_id)[:k]
+    hits = db.similarity_search_with_relevance_scores(user_query, k=k, filter=where)
+    return [(doc, score) for doc, score in hits if score >= threshold]
+
+
+def llm_paraphrases(client, user_query):
+    # Counted against the LLM quota like any call; skipped when it can't start quickly
+    try:
+        with admission.admit(time.monotonic() + PARAPHRASE_TIMEOUT):
+            completion = client.complete(
+                model=TIERS["fast"]["model"],
+                messages=paraphrase_messages(user_query),
+                temperature=0.7,
+                max_tokens=40 * EXPANSION_PARAPHRASES,
+                timeout=PARAPHRASE_TIMEOUT
+            )
+        return parse_paraphrases(completion.text)
+    except Exception:
+        return []
+
+
+def expansion_vectors(user_query, embeddings, client=None):
+    variants = expand_query(user_query)
+    if client is not None and EXPANSION_PARAPHRASES:
+        variants += llm_paraphrases(client, user_query)
+    # Concurrent embed_query calls reach the embedding batcher together and are encoded
+    # as one batch (embedding_service.BatchingEmbeddings)
+    return list(expansion_pool.map(embeddings.embed_query, variants))
+
+
+def search_unified(db, user_query, quotas, threshold, where=None, vectors=None):
+    # One ranked search over a collection holding every source, then at most
+    # quotas[source_type] hits per source, so scores are compared on one scale
+    sources = [source for source, quota in quotas.items() if quota > 0]
+    if not sources:
+        return []
+    source_clause = {"source_type": sources[0]} if len(sources) == 1 else {"source_type": {"$in": sources}}
+    where = {"$and": [where, source_clause]} if where else source_clause
+    taken, hits = {}, []
+    for doc, score in search(db, user_query, sum(quotas.values()), threshold, where, vectors):
+        source = doc.metadata.get("source_type")
+        if taken.get(source, 0) < quotas.get(source, 0):
+            taken[source] = taken.get(source, 0) + 1
+            hits.append((doc, score))
+    return hits
+
+
+def retrieve(json_db, pdf_db, user_query, threshold=0.2, k=7, filters=None, faq_index=None, faq_k=3,
+             client=None, expand=None):
+    # Returns (filters, faq_hits, faq_chunks, hits). expand (default NOVA_QUERY_EXPANSION)
+    # searches query variants as well; client, if given, adds LLM paraphrases
+    if filters is None:
+        filters = infer_filters(user_query)
+    where = build_where(filters)
+
+    vectors = None
+    if QUERY_EXPANSION if expand is None else expand:
+        embeddings = next((getattr(source, "embeddings", None) for source in (pdf_db, json_db, faq_index)
+                           if getattr(source, "embeddings", None) is not None), None)
+        if embeddings is not None:
+            vectors = expansion_vectors(user_query, embeddings, client)
+
+    # The same store passed for both is a unified collection (ingest.build_unified_store)
+    unified = json_db is not None and json_db is pdf_db
+
+    # FAQ lookups go through the question-embedding index when one is loaded, under the
+    # same filter as the stores
+    faq_hits, faq_chunks = [], []
+    if faq_index is not None and vectors:
+        rankings = [faq_index.search_vector(vector, faq_k, FAQ_THRESHOLD, where) for vector in vectors]
+        faq_hits = reciprocal_rank_fusion(rankings, key=lambda entry: entry["question"])[:faq_k]
+    elif faq_index is not None:
+        faq_hits = faq_index.search(user_query, k=faq_k, threshold=FAQ_THRESHOLD, filter=where)
+    if faq_index is not None:
+        faq_chunks = [(faq_chunk_id(entry), entry_text(entry)) for entry, score in faq_hits]
+        json_db = None
+
+    if unified:
+        quotas = {"json": 0 if faq_index is not None else k, "pdf": k}
+        where = where if tagged(pdf_db, filters) else None
+        hits = search_unified(pdf_db, user_query, quotas, threshold, where, vectors)
+        if where and not hits:
+            hits = search_unified(pdf_db, user_query, quotas, threshold, vectors=vectors)
+    else:
+        # Search both databases, pushing the metadata filter into the vector search of
+        # the ones tagged with its keys
+        json_where = where if tagged(json_db, filters) else None
+        pdf_where = where if tagged(pdf_db, filters) else None
+        filtered_json = search(json_db, user_query, k, threshold, json_where, vectors)
+        filtered_pdf = search(pdf_db, user_query, k, threshold, pdf_where, vectors)
+        if (json_where or pdf_where) and not filtered_json and not filtered_pdf:
+            # Nothing tagged for this scope
+            filtered_json = search(json_db, user_query, k, threshold, vectors=vectors)
+            filtered_pdf = search(pdf_db, user_query, k, threshold, vectors=vectors)
+
+        # Combine results
+        hits = filtered_json + filtered_pdf
+    return filters, faq_hits, faq_chunks, hits
+
+
+def filters_key(filters):
+    # Canonical form of explicit filters for cache and coalescing keys; "" when none were
+    # given, since filters inferred from the question follow from the question itself
+    return repr(sorted(filters.items())) if filters else ""
+
+
+def retrieval_key(normalized, index_version, filters, threshold, k, faq_k):
+    return (normalized, index_version, filters_key(filters), threshold, k, faq_k)
+
+
+def prefetch(json_db, pdf_db, partial_query, session_id, index_version="local", threshold=0.2, k=7,
+             filters=None, faq_index=None, faq_k=3):
+    # Called as the question is typed; the last text that stays unchanged for the
+    # debounce interval is retrieved in the background for rag_query to pick up
+    normalized = normalize_query(partial_query)
+    if len(normalized) < PREFETCH_MIN_CHARS:
+        return False
+    key = retrieval_key(normalized, index_version, filters, threshold, k, faq_k)
+    prefetcher.schedule(session_id, key, lambda: retrieve(
+        json_db, pdf_db, partial_query, threshold, k, filters, faq_index, faq_k))
+    return True
+
+
+# RAG Function
+def rag_query(json_db, pdf_db, user_query, threshold=0.2, k=7, client=None, filters=None,
+              faq_index=None, faq_k=3, cancel_event=None, index_version="local", deadline=None,
+              refresh=False):
+    # client is an llm_backends backend; defaults to the one NOVA_LLM_BACKEND selects.
+    # refresh skips the answer cache lookup and overwrites the entry, for precomputation
+    if client is None:
+        client = get_backend()
+    timer = StageTimer()
+    record = {"ts": time.time(), "question": user_query, "index_version": index_version}
+    try:
+        normalized = normalize_query(user_query)
+        record["normalized"] = normalized
+        # Filtered and unfiltered asks of one question are answered from different chunks
+        scope = filters_key(filters)
+        cached = None if refresh else answer_cache.get(normalized, index_version, scope)
+        timer.lap("cache")
+        if cached is not None:
+            record["outcome"] = "cache"
+            return cached
+        if not refresh and negative_cache.get(normalized, index_version, scope) is not None:
+            record["outcome"] = "negative_cache"
+            return NOT_FOUND_ANSWER
+
+        # Reuse retrieval prefetched while the question was being typed, if it matches
+        key = retrieval_key(normalized, index_version, filters, threshold, k, faq_k)
+        retrieved = prefetcher.take(key)
+        record["prefetched"] = retrieved is not None
+        if retrieved is None:
+            retrieved = retrieve(json_db, pdf_db, user_query, threshold, k, filters, faq_index, faq_k, client)
+        filters, faq_hits, faq_chunks, hits = retrieved
+        record["filters"] = filters
+        chunks = faq_chunks + [(chunk_id(doc), doc.page_content) for doc, score in hits]
+        timer.lap("retrieval")
+        record["chunks"] = [{"id": faq_chunk_id(entry), "score": round(score, 4)} for entry, score in faq_hits]
+        record["chunks"] += [{"id": chunk_id(doc), "score": round(score, 4)} for doc, score in hits]
+        if not chunks:
+            return not_found(normalized, index_version, scope, record, "no_hits")
+
+        # Cheap checks before paying for an LLM call that would only say it doesn't know;
+        # an FAQ match has already cleared its own threshold
+        doc_top = max([score for doc, score in hits], default=0.0)
+        record["top_doc_score"] = round(doc_top, 4)
+        if not faq_hits:
+            if NOT_FOUND_FLOOR and doc_top < NOT_FOUND_FLOOR:
+                return not_found(normalized, index_version, scope, record, "score_floor")
+            if doc_top < LEXICAL_GUARD and not shares_terms(user_query, chunks):
+                return not_found(normalized, index_version, scope, record, "no_overlap")
+
+        # Generate context, ordered by chunk ID so prompts share stable prefixes
+        context = canonical_context(chunks)
+
+        # Pick the model tier from retrieval confidence, context size and question type
+        faq_score = faq_hits[0][1] if faq_hits else 0.0
+        scores = [score for doc, score in hits]
+        if faq_hits:
+            # faq_score is a raw cosine; put it on the document relevance scale
+            scores.append(cosine_relevance(faq_score))
+        top_score = max(scores, default=0.0)
+        tier_name, reason = route(user_query, top_score, context, faq_score)
+        record.update(tier=tier_name, route_reason=reason)
+        if tier_name == "faq":
+            answer = faq_hits[0][0]["answer"]
+            answer_cache.put(normalized, index_version, answer, scope)
+            record["outcome"] = "faq"
+            return answer
+        tier = TIERS[tier_name]
+
+        # Size the generation budget and style to the expected answer
+        length, max_tokens, style = answer_budget(user_query, context, tier["max_tokens"])
+        metrics.increment("answer_length", length=length)
+        record.update(model=tier["model"], length=length, max_tokens=max_tokens)
+        timer.lap("prompt")
+
+        # Don't pay for an LLM call nobody is waiting for
+        if cancel_event is not None and cancel_event.is_set():
+            record["outcome"] = "cancelled"
+            return CANCELLED_ANSWER
+
+        # Query LLM, within the provider quota; shed to a fallback answer when overloaded
+        try:
+            with admission.admit(deadline):
+                completion = client.complete(
+                    model=tier["model"],
+                    messages=build_messages(chunks, user_query, style=style),
+                    temperature=0.3,
+                    max_tokens=max_tokens,
+                    timeout=tier["timeout"]
+                )
+        except Overloaded:
+            record["outcome"] = "shed"
+            return degraded_answer(faq_hits)
+        except RateLimited:
+            admission.back_off()
+            record["outcome"] = "rate_limited"
+            return degraded_answer(faq_hits)
+        timer.lap("llm")
+        record.update(outcome="llm", model=completion.model, prompt_tokens=completion.prompt_tokens,
+                      completion_tokens=completion.completion_tokens)
+        answer = completion.text.strip()
+        if REFUSAL_PATTERN.fullmatch(answer):
+            # Learned miss: the next asker gets the not-found reply without retrieval or LLM
+            negative_cache.put(normalized, index_version, NOT_FOUND_ANSWER, scope)
+            metrics.increment("not_found", reason="llm_refused")
+            record["outcome"] = "refused"
+            return NOT_FOUND_ANSWER
+        answer_cache.put(normalized, index_version, answer, scope)
+        return answer
+    except Exception as e:
+        record.update(outcome="error", error=str(e)[:200])
+        return f"An error occurred: {str(e)}"
+    finally:
+        timer.lap("rest")
+        record["timings_ms"] = timer.timings
+        record["total_ms"] = round(sum(timer.timings.values()), 2)
+        query_log.log(record)
+
+
+def rag_query_shared(json_db, pdf_db, user_query, index_version="local", cancel_event=None, **kwargs):
+    # Coalesce on the normalized question and the index version it was answered from
+    key = (normalize_query(user_query), index_version, filters_key(kwargs.get("filters")))
+    answer, shared = inflight.do(
+        key,
+        lambda shared_cancel: rag_query(json_db, pdf_db, user_query, cancel_event=shared_cancel,
+                                        index_version=index_version, **kwargs),
+        cancel_event,
+    )
+    return answer
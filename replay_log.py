@@ -0,0 +1,107 @@
+import argparse
+import json
+import time
+from collections import Counter, defaultdict
+
+from load_test import percentile
+from query_log import QUERY_LOG_PATH, log_files, read_records
+
+# Replays the query log (query_log.py) into the other tools:
+#   --stats        outcome counts and per-stage latency percentiles
+#   --export FILE  distinct questions, most frequent first, as a prompts.text-style list
+#   --warm         re-ask every logged question in order through the local pipeline,
+#                  filling the answer cache at NOVA_ANSWER_CACHE (or --cache)
+#   --calibrate    suggest NOVA_NOT_FOUND_FLOOR from answered vs. refused questions
+# load_test.py also takes the log directly: --prompts logs/requests.jsonl
+
+
+def load_records(path, since_hours=None):
+    cutoff = time.time() - since_hours * 3600 if since_hours else 0
+    return [r for r in read_records(log_files(path)) if r.get("question") and r.get("ts", 0) >= cutoff]
+
+
+def stats(records):
+    timings = defaultdict(list)
+    for r in records:
+        for stage, ms in (r.get("timings_ms") or {}).items():
+            timings[stage].append(ms)
+        timings["total"].append(r.get("total_ms", 0.0))
+    return {
+        "records": len(records),
+        "outcomes": dict(Counter(r.get("outcome", "unknown") for r in records)),
+        "prompt_tokens": sum(r.get("prompt_tokens", 0) for r in records),
+        "completion_tokens": sum(r.get("completion_tokens", 0) for r in records),
+        "timings_ms": {stage: {"p50": percentile(values, 50), "p90": percentile(values, 90),
+                               "p99": percentile(values, 99)} for stage, values in timings.items()},
+    }
+
+
+def frequent_questions(records):
+    # One representative wording per normalized question, most asked first
+    counts, wording = Counter(), {}
+    for r in records:
+        key = r.get("normalized") or r["question"]
+        counts[key] += 1
+        wording.setdefault(key, r["question"])
+    return [(wording[key], count) for key, count in counts.most_common()]
+
+
+def export(records, out_path):
+    with open(out_path, "w", encoding="utf-8") as f:
+        for n, (question, count) in enumerate(frequent_questions(records), 1):
+            f.write(f"{n}){question} (asked {count}x)\n")
+
+
+def calibrate(records, miss_rate=0.02):
+    # The highest floor that would have turned away at most miss_rate of the questions the
+    # LLM actually answered, and how many refusals it would have caught up front
+    answered = [r["top_doc_score"] for r in records if r.get("outcome") == "llm" and "top_doc_score" in r]
+    refused = [r["top_doc_score"] for r in records if r.get("outcome") == "refused" and "top_doc_score" in r]
+    if not answered:
+        return {"answered": 0, "refused": len(refused), "floor": None}
+    floor = round(percentile(answered, 100 * miss_rate), 3)
+    return {
+        "answered": len(answered),
+        "refused": len(refused),
+        "floor": floor,
+        "refusals_caught": sum(score < floor for score in refused),
+    }
+
+
+def warm(records, cache_path=None):
+    import rag_engine
+    from answer_cache import AnswerCache
+    from load_test import pipeline_target
+
+    if cache_path:
+        rag_engine.answer_cache = AnswerCache(cache_path)
+    if not rag_engine.answer_cache.path:
+        raise SystemExit("Set NOVA_ANSWER_CACHE or pass --cache so the warmed answers are kept")
+    ask = pipeline_target()
+    for r in records:
+        ask(r["question"])
+    rag_engine.answer_cache.save()
+    return len(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay the MIT Nova query log")
+    parser.add_argument("--log", default=QUERY_LOG_PATH)
+    parser.add_argument("--since", type=float, help="only records from the last N hours")
+    parser.add_argument("--stats", action="store_true")
+    parser.add_argument("--export", metavar="FILE")
+    parser.add_argument("--warm", action="store_true")
+    parser.add_argument("--calibrate", action="store_true")
+    parser.add_argument("--cache", help="answer cache file for --warm")
+    args = parser.parse_args()
+
+    records = load_records(args.log, args.since)
+    if args.stats or not (args.export or args.warm or args.calibrate):
+        print(json.dumps(stats(records), indent=2))
+    if args.calibrate:
+        print(json.dumps(calibrate(records), indent=2))
+    if args.export:
+        export(records, args.export)
+        print(f"Wrote {len(frequent_questions(records))} questions to {args.export}")
+    if args.warm:
+        print(f"Replayed {warm(records, args.cache)} questions")
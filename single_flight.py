@@ -0,0 +1,50 @@
+import threading
+
+# Collapses concurrent calls with the same key into one execution. Late arrivals wait
+# for the leader's result instead of repeating the embedding, searches and LLM call.
+
+
+class Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.cancel_events = []
+
+    def is_set(self):
+        # Shared cancel flag: only stop once every waiter has given up
+        return bool(self.cancel_events) and all(e is not None and e.is_set() for e in self.cancel_events)
+
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fn, cancel_event=None):
+        # fn(cancel_event) runs once per key; returns (result, shared)
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Call()
+            call.cancel_events.append(cancel_event)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn(call)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self):
+        with self.lock:
+            return len(self.calls)
@@ -0,0 +1,91 @@
+import argparse
+import os
+
+from langchain_core.documents import Document
+
+from ingest import METADATA_FIELDS, SOURCE_METADATA, UNIFIED_COLLECTION, with_metadata
+from prompt_builder import chunk_id
+
+# Converts the per-source Chroma directories into one collection tagged with
+# source_type, reusing the stored vectors so nothing is re-encoded.
+#
+#   python unify_stores.py --out ./nova_db
+#
+# json_db and pdf_db hold one source each; the older rag_db mixes them, so its rows are
+# typed by file extension. Chunks already seen in an earlier store are skipped.
+
+LEGACY_STORES = (("./json_db", "json"), ("./pdf_db", "pdf"), ("./rag_db", None))
+BATCH_SIZE = 1000
+
+
+def source_type_of(metadata, default):
+    if default:
+        return default
+    source = str(metadata.get("source", "")).lower()
+    return "pdf" if source.endswith(".pdf") else "json"
+
+
+def legacy_rows(db_path, default_type):
+    from langchain_community.vectorstores import Chroma
+
+    data = Chroma(persist_directory=db_path).get(include=["embeddings", "documents", "metadatas"])
+    for vector, text, metadata in zip(data["embeddings"], data["documents"], data["metadatas"]):
+        metadata = dict(metadata or {})
+        source_type = source_type_of(metadata, default_type)
+        # Keep any metadata the store already had; fill in what older stores lack
+        with_metadata(metadata, source_type, {key: metadata.get(key) for key in METADATA_FIELDS})
+        metadata["chunk_id"] = chunk_id(Document(page_content=text, metadata=metadata))
+        yield metadata["chunk_id"], list(vector), text, metadata
+
+
+def migrate(stores, out_path):
+    from langchain_community.vectorstores import Chroma
+
+    collection = Chroma(collection_name=UNIFIED_COLLECTION, persist_directory=out_path)._collection
+    seen = set(collection.get(include=[])["ids"])
+    counts = {source_type: 0 for source_type in SOURCE_METADATA}
+    batch, dim = [], None
+
+    def flush():
+        if batch:
+            ids, vectors, texts, metadatas = zip(*batch)
+            collection.add(ids=list(ids), embeddings=list(vectors), documents=list(texts),
+                           metadatas=list(metadatas))
+            batch.clear()
+
+    for db_path, default_type in stores:
+        if not os.path.isdir(db_path):
+            print(f"Skipping {db_path}: not found")
+            continue
+        added = 0
+        for row in legacy_rows(db_path, default_type):
+            row_id, vector, text, metadata = row
+            if dim is None:
+                dim = len(vector)
+            elif len(vector) != dim:
+                raise ValueError(f"{db_path} has {len(vector)}-dim vectors, expected {dim}")
+            if row_id in seen:
+                continue
+            seen.add(row_id)
+            batch.append(row)
+            counts[metadata["source_type"]] += 1
+            added += 1
+            if len(batch) >= BATCH_SIZE:
+                flush()
+        flush()
+        print(f"{db_path}: {added} chunks added")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge the per-source Chroma stores into one collection")
+    parser.add_argument("--out", default="./nova_db")
+    parser.add_argument("--store", action="append", metavar="PATH[:TYPE]",
+                        help="legacy store to include, e.g. ./pdf_db:pdf (default: json_db, pdf_db, rag_db)")
+    args = parser.parse_args()
+
+    stores = LEGACY_STORES
+    if args.store:
+        stores = [tuple(spec.split(":", 1)) if ":" in spec else (spec, None) for spec in args.store]
+    counts = migrate(stores, args.out)
+    print(f"Wrote {sum(counts.values())} chunks to {args.out} ({counts})")
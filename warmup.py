@@ -0,0 +1,118 @@
+import sys
+import threading
+import time
+
+# Startup warm-up: load the embedding model and run one encode, one search per store,
+# one FAQ lookup, and open the LLM connection, so the first real question pays none of
+# it. `readiness` only flips once that has finished.
+#
+# For Streamlit, launch through this module. Warm-up runs in the background while the
+# server starts, and the app then finds the model, Chroma segments and LLM client already
+# loaded in-process. GET /ready answers 503 until warm-up has finished, then 200, with
+# the per-stage timings either way; point the platform health check at it:
+#
+#   python warmup.py MIT_Nova_1.py --server.port $PORT --server.address 0.0.0.0
+
+WARM_QUERY = "How many PTO days does an employee get?"
+
+
+class Readiness:
+    def __init__(self):
+        self.ready = threading.Event()
+        self.report = {}
+
+    def mark_ready(self, report):
+        self.report = report
+        self.ready.set()
+
+    def is_ready(self):
+        return self.ready.is_set()
+
+
+readiness = Readiness()
+
+
+def warm_up(embeddings=None, stores=(), faq_index=None, client=None):
+    # Returns {stage: milliseconds or "error: ..."}; a failing stage doesn't block readiness,
+    # the request path has its own fallbacks
+    report = {}
+
+    def stage(name, fn):
+        start = time.perf_counter()
+        try:
+            fn()
+            report[name] = round((time.perf_counter() - start) * 1000, 1)
+        except Exception as e:
+            report[name] = f"error: {e}"
+
+    if embeddings is not None:
+        stage("encode", lambda: embeddings.embed_query(WARM_QUERY))
+    for n, store in enumerate(dict.fromkeys(store for store in stores if store is not None)):
+        stage(f"search_{n}", lambda: store.similarity_search_with_relevance_scores(WARM_QUERY, k=1))
+    if faq_index is not None:
+        stage("faq", lambda: faq_index.search(WARM_QUERY, k=1))
+    if client is not None:
+        stage("llm", client.warm)
+    readiness.mark_ready(report)
+    return report
+
+
+def warm_app(app=None):
+    # Warms the very objects the app uses: app_index's process-wide stores and FAQ index,
+    # and the cached backend for the Groq key of `app`, the script being launched.
+    # MIT_Nova_streamlit.py opens its index through index_manager instead, so only the
+    # model and the backend carry over to it
+    from app_index import open_app_index
+    from embedding_service import shared_embeddings
+    from llm_backends import get_backend
+
+    json_db, pdf_db, faq_index = open_app_index()
+    return warm_up(shared_embeddings("all-MiniLM-L6-v2"), (json_db, pdf_db), faq_index, get_backend(app=app))
+
+
+def serve_readiness():
+    # Adds GET /ready to the Streamlit server this process is about to start, next to
+    # /_stcore/health (which only says the server is up)
+    import tornado.web
+    from streamlit import config
+    from streamlit.web.server import server
+    from streamlit.web.server.server_util import make_url_path_regex
+
+    class ReadyHandler(tornado.web.RequestHandler):
+        def get(self):
+            self.set_status(200 if readiness.is_ready() else 503)
+            self.write({"ready": readiness.is_ready(), "warmup_ms": readiness.report})
+
+    create_app = server.Server._create_app
+
+    def create_app_with_readiness(self):
+        app = create_app(self)
+        app.add_handlers(".*$", [(make_url_path_regex(config.get_option("server.baseUrlPath"), "ready"),
+                                  ReadyHandler)])
+        return app
+
+    server.Server._create_app = create_app_with_readiness
+
+
+def warm_in_background(app=None):
+    def run():
+        started = time.monotonic()
+        report = warm_app(app)
+        print(f"Warm in {time.monotonic() - started:.1f}s: {report}", flush=True)
+
+    thread = threading.Thread(target=run, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python warmup.py SCRIPT.py [streamlit run options]")
+    serve_readiness()
+    warm_in_background(sys.argv[1])
+
+    # Same process, so the loaded model and clients carry over into the app
+    from streamlit.web import cli as stcli
+
+    sys.argv = ["streamlit", "run"] + sys.argv[1:]
+    sys.exit(stcli.main())